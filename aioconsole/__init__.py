@@ -3,23 +3,17 @@
 It also includes an interactive event loop, and a command line interface.
 """
 
-from .execute import aexec, aeval
-from .console import AsynchronousConsole, interact
-from .stream import ainput, aprint, get_standard_streams
-from .events import InteractiveEventLoop, InteractiveEventLoopPolicy
-from .events import set_interactive_policy, run_console
-from .command import AsynchronousCli
-from .server import start_interactive_server
-from .apython import run_apython
-
-
 __version__ = "0.8.2.dev0"
 
 __all__ = [
     "aexec",
     "aeval",
     "ainput",
+    "alines",
     "aprint",
+    "awrite",
+    "awritelines",
+    "AsyncPrinter",
     "AsynchronousConsole",
     "interact",
     "InteractiveEventLoop",
@@ -29,5 +23,48 @@ __all__ = [
     "AsynchronousCli",
     "start_interactive_server",
     "get_standard_streams",
+    "close_standard_streams",
     "run_apython",
 ]
+
+# The submodules are only imported when one of their names is first accessed
+_submodules = {
+    "aexec": "execute",
+    "aeval": "execute",
+    "ainput": "stream",
+    "alines": "stream",
+    "aprint": "stream",
+    "awrite": "stream",
+    "awritelines": "stream",
+    "AsyncPrinter": "stream",
+    "get_standard_streams": "stream",
+    "close_standard_streams": "stream",
+    "AsynchronousConsole": "console",
+    "interact": "console",
+    "InteractiveEventLoop": "events",
+    "InteractiveEventLoopPolicy": "events",
+    "set_interactive_policy": "events",
+    "run_console": "events",
+    "AsynchronousCli": "command",
+    "start_interactive_server": "server",
+    "run_apython": "apython",
+}
+
+
+_modules = set(_submodules.values()) | {"compat", "rlwrap"}
+
+
+def __getattr__(name):
+    if name in _submodules:
+        module = __import__(f"{__name__}.{_submodules[name]}", fromlist=[name])
+        value = getattr(module, name)
+    elif name in _modules:
+        value = __import__(f"{__name__}.{name}", fromlist=[name])
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
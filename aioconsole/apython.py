@@ -4,11 +4,13 @@ import os
 import sys
 import ast
 import runpy
+import asyncio
 import warnings
 import argparse
 import traceback
 
 from . import events
+from . import execute
 from . import server
 from . import rlwrap
 from . import compat
@@ -22,8 +24,8 @@ If no argument is given, it simply runs an asynchronous python console."""
 
 USAGE = """\
 usage: apython [-h] [--serve [HOST:] PORT] [--no-readline]
-               [--banner BANNER] [--locals LOCALS]
-               [-m MODULE | FILE] ...
+               [--in-process] [--banner BANNER] [--locals LOCALS]
+               [-m MODULE | -c CMD | FILE] ...
 """.split(
     "usage: "
 )[
@@ -68,6 +70,11 @@ def parse_args(args=None):
         action="store_false",
         help="disable readline support",
     )
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="run readline in a thread instead of wrapping a subprocess",
+    )
     parser.add_argument("--banner", help="provide a custom banner")
     parser.add_argument(
         "--locals", type=ast.literal_eval, help="provide custom locals as a dictionary"
@@ -79,7 +86,15 @@ def parse_args(args=None):
 
     # Input
 
-    parser.add_argument("-m", dest="module", help="run a python module")
+    # A file given along with a module or a command is its first argument
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("-m", dest="module", help="run a python module")
+    group.add_argument(
+        "-c",
+        dest="command",
+        metavar="CMD",
+        help="run the given code without a console ('-' to read it from stdin)",
+    )
     parser.add_argument(
         "filename", metavar="FILE", nargs="?", help="python file to run"
     )
@@ -92,10 +107,16 @@ def parse_args(args=None):
 
     namespace = parser.parse_args(args)
 
-    # If module is provided, filename is actually the fist arg
-    if namespace.module is not None and namespace.filename is not None:
+    # If module or command is provided, filename is actually the fist arg
+    if namespace.filename is not None and (
+        namespace.module is not None or namespace.command is not None
+    ):
         namespace.args.insert(0, namespace.filename)
 
+    # Commands do not run a console
+    if namespace.serve is not None and namespace.command is not None:
+        parser.error("argument --serve/-s: not allowed with argument -c")
+
     # Parse the serve argument
     if namespace.serve is not None:
         namespace.serve = server.parse_server(namespace.serve, parser)
@@ -112,15 +133,36 @@ def load_readline():
     return True
 
 
+def run_command(command, locals_dict=None, filename="<string>"):
+    """Run the given code in a single event loop, without any console."""
+    if command == "-":
+        command = sys.stdin.read()
+    if locals_dict is None:
+        locals_dict = {}
+    locals_dict.setdefault("__name__", "__main__")
+    coro = execute.aexec(command, locals_dict, filename=filename, strategy="namespace")
+    try:
+        asyncio.run(coro)
+    except Exception:
+        # Hide the frames of the event loop and aexec
+        exc_type, exc, tb = sys.exc_info()
+        while tb is not None and tb.tb_frame.f_code.co_filename != filename:
+            tb = tb.tb_next
+        traceback.print_exception(exc_type, exc, tb)
+        sys.exit(1)
+
+
 def run_apython(args=None):
     namespace = parse_args(args)
 
-    if (
+    readline = (
         namespace.readline
+        and namespace.command is None
         and not namespace.serve
         and compat.platform != "win32"
         and load_readline()
-    ):
+    )
+    if readline:
         # Run python interactive hook in order to configure binding and history support
         interactive_hook = getattr(sys, "__interactivehook__", None)
         if interactive_hook:
@@ -129,13 +171,18 @@ def run_apython(args=None):
             except Exception as exc:
                 warnings.warn(f"Interactive hook failed: {exc!r}", stacklevel=2)
 
-        code = run_apython_in_subprocess(args, namespace.prompt_control)
-        sys.exit(code)
+        if not namespace.in_process:
+            code = run_apython_in_subprocess(args, namespace.prompt_control)
+            sys.exit(code)
 
     try:
         sys._argv = sys.argv
         sys._path = sys.path
-        if namespace.module:
+        if namespace.command is not None:
+            sys.argv = ["-c"] + namespace.args
+            sys.path.insert(0, "")
+            run_command(namespace.command, namespace.locals)
+        elif namespace.module:
             sys.argv = [None] + namespace.args
             sys.path.insert(0, "")
             events.set_interactive_policy(
@@ -143,6 +190,7 @@ def run_apython(args=None):
                 banner=namespace.banner,
                 serve=namespace.serve,
                 prompt_control=namespace.prompt_control,
+                readline=readline,
             )
             runpy.run_module(namespace.module, run_name="__main__", alter_sys=True)
         elif namespace.filename:
@@ -154,6 +202,7 @@ def run_apython(args=None):
                 banner=namespace.banner,
                 serve=namespace.serve,
                 prompt_control=namespace.prompt_control,
+                readline=readline,
             )
             runpy.run_path(namespace.filename, run_name="__main__")
         else:
@@ -165,6 +214,7 @@ def run_apython(args=None):
                 banner=namespace.banner,
                 serve=namespace.serve,
                 prompt_control=namespace.prompt_control,
+                readline=readline,
             )
     finally:
         sys.argv = sys._argv
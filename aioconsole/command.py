@@ -8,6 +8,9 @@ from . import console
 
 
 class AsynchronousCli(console.AsynchronousConsole):
+    # Commands are not python code
+    input_tracker_class = None
+
     def __init__(
         self, commands, streams=None, *, prog=None, prompt_control=None, loop=None
     ):
@@ -1,5 +1,6 @@
 """Provide an asynchronous equivalent to the python console."""
 
+import re
 import sys
 import code
 import pydoc
@@ -11,6 +12,7 @@ import functools
 import traceback
 
 from . import stream
+from . import rlwrap
 from . import execute
 
 EXTRA_MESSAGE = """\
@@ -28,13 +30,108 @@ except NameError:
 
 
 class AsynchronousCompiler(codeop.CommandCompiler):
-    def __init__(self):
+    def __init__(self, local=None, strategy="statement"):
+        # The namespace strategy compiles the statements when running them
+        if strategy == "namespace":
+            self.compiler = functools.partial(
+                execute.parse_for_namespace_aexec, dont_imply_dedent=True
+            )
+            return
+        # The local names are used to compile the statements in advance
         self.compiler = functools.partial(
-            execute.compile_for_aexec, dont_imply_dedent=True
+            execute.compile_for_aexec,
+            dont_imply_dedent=True,
+            local={} if local is None else local,
         )
 
 
+class InputTracker:
+    """Incrementally check whether the console input could be complete.
+
+    Each line is scanned once, keeping track of the open brackets, the
+    unterminated strings, the line continuations and the compound statements.
+    This way, the input only gets compiled when it could be complete.
+    """
+
+    # Keywords starting compound statements, even on a single line
+    compound_keywords = re.compile(
+        r"\s*(if|elif|else|for|while|try|except|finally|with|def|class|async)\b"
+    )
+
+    def __init__(self):
+        self.brackets = 0
+        self.string = None  # closing quotes of the current string
+        self.continuation = False
+        self.block = False
+        self.dedented = False
+        self.compound = False
+        self.first = None  # first significant character of the logical line
+        self.last = None  # last significant character of the logical line
+
+    def feed(self, line):
+        """Feed a new line and return False if the input is incomplete."""
+        # Start a new logical line
+        if not (self.brackets > 0 or self.string or self.continuation):
+            # A blank line ends compound statements
+            if not line.strip():
+                return True
+            # A non-indented line in a compound statement might be an error
+            self.dedented = self.block and not line[:1].isspace()
+            self.compound = self.compound_keywords.match(line) is not None
+            self.first = self.last = None
+        self.continuation = False
+
+        # Scan the line
+        i, length = 0, len(line)
+        while i < length:
+            char = line[i]
+            if self.string:
+                if char == "\\":
+                    self.continuation = i == length - 1
+                    i += 2
+                elif line.startswith(self.string, i):
+                    i += len(self.string)
+                    self.string = None
+                    self.last = char
+                else:
+                    i += 1
+                continue
+            if char == "#":
+                break
+            if char in "\"'":
+                self.string = char * 3 if line.startswith(char * 3, i) else char
+                i += len(self.string)
+                self.first = self.first or char
+                continue
+            if char in "([{":
+                self.brackets += 1
+            elif char in ")]}":
+                self.brackets -= 1
+            elif char == "\\":
+                self.continuation = i == length - 1
+            if not char.isspace():
+                self.first = self.first or char
+                self.last = char
+            i += 1
+
+        # Let the compiler report unterminated single-quoted strings
+        if self.string and len(self.string) == 1 and not self.continuation:
+            self.string = None
+            return True
+        # The logical line continues
+        if self.string or self.continuation or self.brackets > 0:
+            return False
+        # Compound statements end with a blank line
+        if self.compound or self.first == "@" or self.last == ":":
+            self.block = True
+            return False
+        return not self.block or self.dedented
+
+
 class AsynchronousConsole(code.InteractiveConsole):
+    # Incremental check of the input completeness (None to disable it)
+    input_tracker_class = InputTracker
+
     def __init__(
         self,
         streams=None,
@@ -43,6 +140,9 @@ class AsynchronousConsole(code.InteractiveConsole):
         prompt_control=None,
         *,
         loop=None,
+        strategy="statement",
+        bulk_input=False,
+        readline=False,
     ):
         super().__init__(locals, filename)
         # Process arguments
@@ -56,7 +156,13 @@ class AsynchronousConsole(code.InteractiveConsole):
         self.reader = None
         self.writer = None
         self.prompt_control = prompt_control
-        self.compile = AsynchronousCompiler()
+        self.strategy = strategy
+        self.bulk_input = bulk_input
+        # Readline runs in a dedicated thread, instead of reading the streams
+        self.readline = rlwrap.ReadlineThread() if readline else None
+        # The local names are only used by the statement strategy
+        local = self.locals if strategy == "statement" else None
+        self.compile = AsynchronousCompiler(local, strategy)
         # Populate locals
         self.locals["asyncio"] = asyncio
         self.locals["loop"] = self.loop
@@ -79,6 +185,9 @@ class AsynchronousConsole(code.InteractiveConsole):
     async def ainput(self, prompt="", *, streams=None, use_stderr=False, loop=None):
         # Get the console streams by default
         if streams is None and use_stderr is False:
+            if self.readline is not None:
+                await self.flush()
+                return await self.readline.input(prompt)
             streams = self.reader, self.writer
         # Wrap the prompt with prompt control characters
         if self.prompt_control and self.prompt_control not in prompt:
@@ -110,16 +219,25 @@ class AsynchronousConsole(code.InteractiveConsole):
     async def runcode(self, code):
         try:
             await execute.aexec(
-                code, local=self.locals, stream=self, filename=self.filename
+                code,
+                local=self.locals,
+                stream=self,
+                filename=self.filename,
+                strategy=self.strategy,
             )
         except SystemExit:
             raise
         except BaseException:
             self.showtraceback()
-        await self.flush()
+        # In bulk mode, flush once all the available input has been processed
+        if not (self.bulk_input and stream.has_buffered_line(self.reader)):
+            await self.flush()
 
     def resetbuffer(self):
         self.buffer = []
+        self.input_tracker = None
+        if self.input_tracker_class is not None:
+            self.input_tracker = self.input_tracker_class()
 
     def handle_sigint(self, task):
         self._sigint_received = True
@@ -192,7 +310,12 @@ class AsynchronousConsole(code.InteractiveConsole):
                 else:
                     prompt = sys.ps1
                 try:
-                    line = await self.raw_input(prompt)
+                    # In bulk mode, available lines are processed without prompt
+                    line = None
+                    if self.bulk_input:
+                        line = stream.read_buffered_line(self.reader)
+                    if line is None:
+                        line = await self.raw_input(prompt)
                 except EOFError:
                     try:
                         self.write("\n")
@@ -215,6 +338,9 @@ class AsynchronousConsole(code.InteractiveConsole):
 
     async def push(self, line):
         self.buffer.append(line)
+        # Skip the compilation while the input is known to be incomplete
+        if self.input_tracker is not None and not self.input_tracker.feed(line):
+            return True
         source = "\n".join(self.buffer)
         more = await self.runsource(source, self.filename)
         if not more:
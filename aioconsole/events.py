@@ -4,6 +4,7 @@ import asyncio
 import functools
 
 from . import server
+from . import stream
 from . import console
 
 
@@ -20,18 +21,19 @@ class InteractiveEventLoop(asyncio.SelectorEventLoop):
         banner=None,
         serve=None,
         prompt_control=None,
+        readline=False,
     ):
         self.console = None
         self.console_task = None
         self.console_server = None
         super().__init__(selector=selector)
         # Factory
-        self.factory = lambda streams: self.console_class(
-            streams, locals=locals, prompt_control=prompt_control, loop=self
+        self.factory = lambda streams, **kwargs: self.console_class(
+            streams, locals=locals, prompt_control=prompt_control, loop=self, **kwargs
         )
         # Local console
         if serve is None:
-            self.console = self.factory(None)
+            self.console = self.factory(None, readline=readline)
             coro = self.console.interact(banner, stop=True, handle_sigint=True)
             self.console_task = asyncio.ensure_future(coro, loop=self)
         # Serving console
@@ -46,6 +48,7 @@ class InteractiveEventLoop(asyncio.SelectorEventLoop):
     def close(self):
         if self.console_task and not self.is_running():
             asyncio.Future.cancel(self.console_task)
+        stream.close_standard_streams(loop=self)
         super().close()
 
     def __del__(self):
@@ -60,31 +63,50 @@ class InteractiveEventLoop(asyncio.SelectorEventLoop):
 class InteractiveEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
     """Policy to use the interactive event loop by default."""
 
-    def __init__(self, *, locals=None, banner=None, serve=None, prompt_control=None):
+    def __init__(
+        self,
+        *,
+        locals=None,
+        banner=None,
+        serve=None,
+        prompt_control=None,
+        readline=False,
+    ):
         self._loop_factory = functools.partial(
             InteractiveEventLoop,
             locals=locals,
             banner=banner,
             serve=serve,
             prompt_control=prompt_control,
+            readline=readline,
         )
         super().__init__()
 
 
 def set_interactive_policy(
-    *, locals=None, banner=None, serve=None, prompt_control=None
+    *, locals=None, banner=None, serve=None, prompt_control=None, readline=False
 ):
     """Use an interactive event loop by default."""
     policy = InteractiveEventLoopPolicy(
-        locals=locals, banner=banner, serve=serve, prompt_control=prompt_control
+        locals=locals,
+        banner=banner,
+        serve=serve,
+        prompt_control=prompt_control,
+        readline=readline,
     )
     asyncio.set_event_loop_policy(policy)
 
 
-def run_console(*, locals=None, banner=None, serve=None, prompt_control=None):
+def run_console(
+    *, locals=None, banner=None, serve=None, prompt_control=None, readline=False
+):
     """Run the interactive event loop."""
     loop = InteractiveEventLoop(
-        locals=locals, banner=banner, serve=serve, prompt_control=prompt_control
+        locals=locals,
+        banner=banner,
+        serve=serve,
+        prompt_control=prompt_control,
+        readline=readline,
     )
     asyncio.set_event_loop(loop)
     try:
@@ -2,13 +2,37 @@
 
 import ast
 import codeop
+import functools
 from io import StringIO
+from types import CodeType
+from inspect import CO_COROUTINE
 from tokenize import generate_tokens, STRING, TokenError
 
 CORO_NAME = "__corofn"
 CORO_DEF = f"async def {CORO_NAME}(): "
 CORO_CODE = CORO_DEF + "return (None, locals())\n"
 
+# Statements without await run in a regular function instead
+FUNC_CODE = f"def {CORO_NAME}(): return (None, locals())\n"
+
+# Batch mode: all the statements run in a single coroutine
+ECHO_NAME = "__corofn_echo"
+LOCALS_NAME = "__corofn_locals"
+BATCH_CODE = f"""\
+def {CORO_NAME}():
+    global {LOCALS_NAME}
+    try:
+        pass
+    finally:
+        {LOCALS_NAME} = locals()
+"""
+
+# Namespace mode: the statements are compiled as top-level code
+NAMESPACE_FLAGS = ast.PyCF_ALLOW_TOP_LEVEL_AWAIT
+
+# Maximum number of entries kept in the compilation cache used by *aexec*
+CACHE_SIZE = 256
+
 
 def make_arg(key, annotation=None):
     """Make an ast function argument."""
@@ -19,10 +43,96 @@ def make_arg(key, annotation=None):
 
 def full_update(dct, values):
     """Fully update a dictionary."""
+    if isinstance(dct, CopyOnWriteNamespace):
+        return dct.reset(values)
     dct.clear()
     dct.update(values)
 
 
+class CopyOnWriteNamespace(dict):
+    """Namespace reading through a shared namespace and writing locally.
+
+    This allows many consoles to share a large namespace without copying it.
+    The shared names deleted from this namespace are hidden, and the shared
+    namespace itself is never modified.
+    """
+
+    def __init__(self, shared):
+        super().__init__()
+        self.shared = shared
+        self.deleted = set()
+
+    def __missing__(self, key):
+        if key in self.deleted:
+            raise KeyError(key)
+        return self.shared[key]
+
+    def __contains__(self, key):
+        if super().__contains__(key):
+            return True
+        return key in self.shared and key not in self.deleted
+
+    def __iter__(self):
+        yield from super().__iter__()
+        for key in self.shared:
+            if not super().__contains__(key) and key not in self.deleted:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        if super().__contains__(key):
+            super().__delitem__(key)
+        if key in self.shared:
+            self.deleted.add(key)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def pop(self, key, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError(key)
+        value = self[key]
+        del self[key]
+        return value
+
+    def clear(self):
+        super().clear()
+        self.deleted = set(self.shared)
+
+    def copy(self):
+        return dict(self.items())
+
+    def reset(self, values):
+        """Replace the content of the namespace with the given values.
+
+        Only the values that differ from the shared namespace are stored, and
+        the missing shared names are marked as deleted.
+        """
+        missing = object()
+        super().clear()
+        super().update(
+            (key, value)
+            for key, value in values.items()
+            if self.shared.get(key, missing) is not value
+        )
+        self.deleted = {key for key in self.shared if key not in values}
+
+
 def exec_single_result(obj, local, stream):
     """Reproduce the exec behavior in single mode (print and builtins._)"""
     local["_"] = obj
@@ -30,6 +140,13 @@ def exec_single_result(obj, local, stream):
         print(repr(obj), file=stream)
 
 
+def echo_single_result(obj, stream):
+    """Reproduce the exec behavior in single mode, returning the object."""
+    if obj is not None:
+        print(repr(obj), file=stream)
+    return obj
+
+
 class ReturnChecker(ast.NodeVisitor):
     def __init__(self, filename):
         super().__init__()
@@ -57,36 +174,187 @@ class ReturnChecker(ast.NodeVisitor):
         self.visit_Yield(node)  # handle in the same way as regular yield
 
 
-def make_tree(statement, filename, mode):
+class AwaitChecker(ast.NodeVisitor):
+    def __init__(self):
+        super().__init__()
+        self.found = False
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        # Skip the body, but not the decorators, defaults and annotations
+        for child in (*node.decorator_list, node.args, node.returns):
+            if child is not None:
+                self.visit(child)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        self.visit_FunctionDef(node)  # handle in the same way as functions
+
+    def visit_Lambda(self, node: ast.Lambda):
+        self.visit(node.args)  # skip the body
+
+    def visit_Await(self, node: ast.Await):
+        self.found = True
+
+    def visit_AsyncFor(self, node: ast.AsyncFor):
+        self.found = True
+
+    def visit_AsyncWith(self, node: ast.AsyncWith):
+        self.found = True
+
+    def visit_comprehension(self, node: ast.comprehension):
+        if node.is_async:
+            self.found = True
+        self.generic_visit(node)
+
+
+def has_await(*statements):
+    """Check whether the statements need to run in a coroutine."""
+    checker = AwaitChecker()
+    for statement in statements:
+        checker.visit(statement)
+    return checker.found
+
+
+def make_tree(statement, filename, mode, names=()):
     """Helper for *aexec*."""
     # Check for returns and yields
     ReturnChecker(filename).visit(statement)
 
-    # Create tree
-    tree = ast.parse(CORO_CODE, filename, "single")
+    # Create tree, using a regular function if no coroutine is necessary
+    code = CORO_CODE if has_await(statement) else FUNC_CODE
+    tree = ast.parse(code, filename, "single")
     # Check expression statement
     if isinstance(statement, ast.Expr):
         tree.body[0].body[0].value.elts[0] = statement.value
     else:
         tree.body[0].body.insert(0, statement)
-    # Check the coroutine function
-    exec(compile(tree, filename, "single"))
 
     if mode == "exec":
-        return ast.Module([tree])
-    if mode == "single":
-        return ast.Interactive([tree])
-    assert mode == "eval"
-    raise ValueError("Mode 'eval' is not supported")
+        wrapped = ast.Module([tree])
+    elif mode == "single":
+        wrapped = ast.Interactive([tree])
+    else:
+        assert mode == "eval"
+        raise ValueError("Mode 'eval' is not supported")
 
+    # Keep the original statement for the batch mode
+    wrapped.statement = statement
 
-def make_coroutine_from_tree(wrapped, filename, local):
-    """Make a coroutine from a tree structure."""
-    dct = {}
+    # Compile and check the coroutine function, using the expected local names
+    # as arguments so the code can be used as is when the statement is executed
+    try:
+        compile_coroutine_function(wrapped, filename, names)
+    except SyntaxError:
+        if not names:
+            raise
+        # The arguments might cause the error (e.g `global x` with `x` in the
+        # local names), in which case it is deferred to the execution
+        compile_coroutine_function(wrapped, filename, ())
+    return wrapped
+
+
+def compile_coroutine_function(wrapped, filename, names):
+    """Compile a tree structure into a coroutine function definition.
+
+    The code is kept in the `compiled` attribute of the tree, along with
+    the local names used as arguments.
+    """
     tree = wrapped.body[0]
-    tree.body[0].args.args = list(map(make_arg, local))
-    exec(compile(tree, filename, "single"), dct)
-    return dct[CORO_NAME](**local)
+    tree.body[0].args.args = list(map(make_arg, names))
+    code = compile(tree, filename, "single")
+    wrapped.compiled = names, code
+    return code
+
+
+def get_coroutine_function_code(wrapped, filename, names):
+    """Return the code of the coroutine function for the given local names."""
+    compiled_names, code = getattr(wrapped, "compiled", (None, None))
+    if compiled_names == names:
+        return code
+    return compile_coroutine_function(wrapped, filename, names)
+
+
+def predict_local_names(wrapped):
+    """Predict the local names after the given tree has been executed."""
+    _, code = wrapped.compiled
+    for const in code.co_consts:
+        if isinstance(const, CodeType) and const.co_name == CORO_NAME:
+            break
+    else:  # pragma: no cover
+        assert False
+    # Same order as the dictionary returned by `locals()`
+    names = dict.fromkeys(const.co_varnames + const.co_cellvars)
+    if isinstance(wrapped, ast.Interactive):
+        names["_"] = None
+    return tuple(names)
+
+
+def make_function_from_code(code):
+    """Make a (coroutine) function from its compiled definition."""
+    dct = {}
+    exec(code, dct)
+    return dct[CORO_NAME]
+
+
+def make_function_from_tree(wrapped, filename, local):
+    """Make a (coroutine) function from a tree structure."""
+    code = get_coroutine_function_code(wrapped, filename, tuple(local))
+    return make_function_from_code(code)
+
+
+def make_batch_tree(statements, filename, interactive=False):
+    """Helper for *aexec* in batch mode."""
+    body = []
+    for statement in statements:
+        # Check for returns and yields
+        ReturnChecker(filename).visit(statement)
+        if not interactive:
+            body.append(statement)
+            continue
+        # Reproduce the single mode for each statement:
+        # `_ = __corofn_echo(value)` for expressions, `_ = None` otherwise
+        if isinstance(statement, ast.Expr):
+            func = ast.Name(ECHO_NAME, ast.Load())
+            value = ast.Call(func, [statement.value], [])
+        else:
+            body.append(statement)
+            value = ast.Constant(None)
+        target = ast.Name("_", ast.Store())
+        assign = ast.copy_location(ast.Assign([target], value), statement)
+        body.append(ast.fix_missing_locations(assign))
+
+    # Insert the statements in the `try` clause,
+    # using a regular function if no coroutine is necessary
+    code = "async " + BATCH_CODE if has_await(*statements) else BATCH_CODE
+    tree = ast.parse(code, filename, "exec")
+    if body:
+        tree.body[0].body[1].body = body
+    return tree
+
+
+def compile_batch(statements, filename, names, interactive=False):
+    """Compile the statements into a single coroutine function definition."""
+    tree = make_batch_tree(statements, filename, interactive)
+    tree.body[0].args.args = list(map(make_arg, names))
+    return compile(tree, filename, "exec")
+
+
+def compile_for_namespace(statements, filename, interactive=False):
+    """Compile the statements as top-level code, allowing top-level await.
+
+    In interactive mode, expression statements are compiled in eval mode
+    so their value can be displayed.
+    """
+    for statement in statements:
+        # Check for returns and yields
+        ReturnChecker(filename).visit(statement)
+    if interactive and len(statements) == 1 and isinstance(statements[0], ast.Expr):
+        tree = ast.Expression(statements[0].value)
+        return compile(tree, filename, "eval", NAMESPACE_FLAGS)
+    # Prevent a leading string from being used as the module docstring
+    if statements:
+        statements = [ast.copy_location(ast.Pass(), statements[0]), *statements]
+    tree = ast.Module(statements, [])
+    return compile(tree, filename, "exec", NAMESPACE_FLAGS)
 
 
 def get_non_indented_lines(source):
@@ -99,10 +367,8 @@ def get_non_indented_lines(source):
         pass
 
 
-def compile_for_aexec(
-    source, filename, mode, dont_imply_dedent=False, local={}, **kwargs
-):
-    """Return a list of (coroutine object, abstract base tree)."""
+def parse_for_aexec(source, filename, mode, dont_imply_dedent=False):
+    """Return the list of statement trees in the given source."""
     flags = ast.PyCF_ONLY_AST
     if dont_imply_dedent:
         flags |= codeop.PyCF_DONT_IMPLY_DEDENT
@@ -133,23 +399,156 @@ def compile_for_aexec(
     except SyntaxError:
         raise
 
-    return [make_tree(statement, filename, mode) for statement in statements]
+    return statements
+
+
+def compile_for_aexec(
+    source, filename, mode, dont_imply_dedent=False, local={}, **kwargs
+):
+    """Return a list of (coroutine object, abstract base tree)."""
+    statements = parse_for_aexec(source, filename, mode, dont_imply_dedent)
+
+    # Each statement is compiled with the local names expected at this point
+    trees = []
+    names = tuple(local)
+    for statement in statements:
+        wrapped = make_tree(statement, filename, mode, names)
+        names = predict_local_names(wrapped)
+        trees.append(wrapped)
+    return trees
+
+
+def parse_for_namespace_aexec(
+    source, filename, mode, dont_imply_dedent=False, **kwargs
+):
+    """Return a list of statement trees for the namespace strategy.
+
+    The statements are only parsed and checked, since they get compiled
+    as top-level code when they are executed.
+    """
+    if mode == "eval":
+        raise ValueError("Mode 'eval' is not supported")
+    trees = []
+    for statement in parse_for_aexec(source, filename, mode, dont_imply_dedent):
+        # Check for returns and yields
+        ReturnChecker(filename).visit(statement)
+        wrapped = ast.Interactive([]) if mode == "single" else ast.Module([], [])
+        wrapped.statement = statement
+        trees.append(wrapped)
+    return trees
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_cached_trees(source, filename, mode, names):
+    """Cached version of *compile_for_aexec*, returning a tuple of trees."""
+    return tuple(compile_for_aexec(source, filename, mode, local=names))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_cached_batch(source, filename, names):
+    """Cached version of *compile_batch* for a source in exec mode."""
+    statements = parse_for_aexec(source, filename, "exec")
+    return compile_batch(statements, filename, names)
+
+
+async def aexec_batch(source, local, stream, filename):
+    """Helper for *aexec* in batch mode."""
+    names = tuple(local)
+    if isinstance(source, str):
+        code = get_cached_batch(source, filename, names)
+    else:
+        trees = list(source)
+        statements = [tree.statement for tree in trees]
+        interactive = any(isinstance(tree, ast.Interactive) for tree in trees)
+        code = compile_batch(statements, filename, names, interactive)
+    dct = {ECHO_NAME: functools.partial(echo_single_result, stream=stream)}
+    exec(code, dct)
+    function = dct[CORO_NAME]
+    try:
+        if function.__code__.co_flags & CO_COROUTINE:
+            await function(**local)
+        else:
+            function(**local)
+    finally:
+        # The locals are set by the coroutine, even if an exception is raised
+        if LOCALS_NAME in dct:
+            full_update(local, dct[LOCALS_NAME])
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_cached_namespace_code(source, filename):
+    """Cached version of *compile_for_namespace* for a source in exec mode."""
+    statements = parse_for_aexec(source, filename, "exec")
+    return compile_for_namespace(statements, filename)
 
 
-async def aexec(source, local=None, stream=None, filename="<aexec>"):
-    """Asynchronous equivalent to *exec*."""
+async def aexec_namespace(source, local, stream, filename):
+    """Helper for *aexec* in namespace mode."""
+    if isinstance(source, str):
+        items = [(get_cached_namespace_code(source, filename), False)]
+    else:
+        items = []
+        for tree in source:
+            interactive = isinstance(tree, ast.Interactive)
+            code = compile_for_namespace([tree.statement], filename, interactive)
+            items.append((code, interactive))
+    for code, interactive in items:
+        result = eval(code, local)
+        if code.co_flags & CO_COROUTINE:
+            result = await result
+        if interactive:
+            exec_single_result(result, local, stream)
+
+
+async def aexec(
+    source, local=None, stream=None, filename="<aexec>", *, strategy="statement"
+):
+    """Asynchronous equivalent to *exec*.
+
+    The `strategy` argument controls how the statements are executed:
+    - "statement": each statement runs in its own coroutine (default)
+    - "batch": all the statements run in a single coroutine, and the
+      local namespace is only updated once at the end
+    - "namespace": the local namespace is used as the global namespace
+      of the statements, so they read and write it directly (like *exec*,
+      a reference to the builtins is inserted under `__builtins__`)
+    """
     if local is None:
         local = {}
+    if strategy == "batch":
+        return await aexec_batch(source, local, stream, filename)
+    if strategy == "namespace":
+        return await aexec_namespace(source, local, stream, filename)
+    if strategy != "statement":
+        raise ValueError(f"Unknown strategy: {strategy!r}")
     if isinstance(source, str):
-        source = compile_for_aexec(source, filename, "exec")
+        source = get_cached_trees(source, filename, "exec", tuple(local))
     for tree in source:
-        coro = make_coroutine_from_tree(tree, filename, local=local)
-        result, new_local = await coro
+        function = make_function_from_tree(tree, filename, local=local)
+        # Statements without await do not need a coroutine
+        if function.__code__.co_flags & CO_COROUTINE:
+            result, new_local = await function(**local)
+        else:
+            result, new_local = function(**local)
         if isinstance(tree, ast.Interactive):
             exec_single_result(result, new_local, stream)
         full_update(local, new_local)
 
 
+def compile_for_aeval(source, filename):
+    """Compile an expression in eval mode, allowing top-level await."""
+    tree = ast.parse(source, filename, "eval")
+    # Check for yields
+    ReturnChecker(filename).visit(tree)
+    return compile(tree, filename, "eval", NAMESPACE_FLAGS)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_cached_eval_code(source, filename):
+    """Cached version of *compile_for_aeval*."""
+    return compile_for_aeval(source, filename)
+
+
 async def aeval(source, local=None):
     """Asynchronous equivalent to *eval*."""
     if local is None:
@@ -158,22 +557,22 @@ async def aeval(source, local=None):
     if not isinstance(local, dict):
         raise TypeError("globals must be a dict")
 
-    # Ensure that the result key is unique within the local namespace
-    key = "__aeval_result__"
-    while key in local:
-        key += "_"
-
     # Perform syntax check to ensure the input is a valid eval expression
-    try:
-        ast.parse(source, mode="eval")
-    except SyntaxError:
-        raise
-
-    # Assign the result of the expression to a known variable
-    wrapped_code = f"{key} = {source}"
-
-    # Use aexec to evaluate the wrapped code within the given local namespace
-    await aexec(wrapped_code, local=local)
+    filename = "<aeval>"
+    if isinstance(source, str):
+        code = get_cached_eval_code(source, filename)
+    else:
+        code = compile_for_aeval(source, filename)
 
-    # Return the result from the local namespace
-    return local.pop(key)
+    # Evaluate the expression within the given local namespace,
+    # without leaving a reference to the builtins in it
+    builtins_missing = "__builtins__" not in local
+    try:
+        result = eval(code, local)
+        # Only expressions using await produce a coroutine
+        if code.co_flags & CO_COROUTINE:
+            result = await result
+    finally:
+        if builtins_missing:
+            local.pop("__builtins__", None)
+    return result
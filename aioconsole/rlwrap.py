@@ -1,11 +1,16 @@
-"""Provide a readline wrapper to control a subprocess."""
+"""Provide a readline wrapper to control a subprocess or a console."""
 
+import os
 import sys
+import asyncio
+import codecs
+import locale
 import ctypes
+import queue
 import signal
 import builtins
+import threading
 import subprocess
-from concurrent.futures import ThreadPoolExecutor
 
 from . import compat
 
@@ -19,7 +24,6 @@ def rlwrap_process(args, prompt_control, use_stderr=False):
     process = subprocess.Popen(
         args,
         bufsize=0,
-        universal_newlines=True,
         stdin=subprocess.PIPE,
         **{"stderr" if use_stderr else "stdout": subprocess.PIPE},
     )
@@ -35,76 +39,184 @@ def _rlwrap(process, prompt_control, use_stderr=False):
     # Check prompt control
     assert len(prompt_control) == 1
 
-    # Run background task
-    with ThreadPoolExecutor(1) as executor:
-        future = executor.submit(wait_for_prompt, source, dest, prompt_control)
+    # Relay the output in a background thread
+    encoding = locale.getpreferredencoding(False)
+    reader = PromptReader(source, dest, prompt_control, encoding=encoding)
+    prompts = queue.Queue()
+    thread = threading.Thread(target=reader.relay, args=(prompts,), daemon=True)
+    thread.start()
 
-        # Loop over prompts
-        while process.poll() is None:
-            # Get prompt
-            try:
-                prompt = future.result()
-            except KeyboardInterrupt:
-                process.send_signal(signal.SIGINT)
-                continue
-            except EOFError:
-                break
-            else:
-                future = executor.submit(wait_for_prompt, source, dest, prompt_control)
+    # Loop over prompts
+    while True:
+        # Get prompt
+        try:
+            prompt = prompts.get()
+        except KeyboardInterrupt:
+            process.send_signal(signal.SIGINT)
+            continue
+        if prompt is None:
+            break
 
-            # Get user input
-            try:
-                raw = input(prompt, use_stderr=use_stderr) + "\n"
-            except KeyboardInterrupt:
-                process.send_signal(signal.SIGINT)
-                continue
-            except EOFError:
-                break
-            else:
-                process.stdin.write(raw)
+        # Get user input
+        try:
+            raw = input(prompt, use_stderr=use_stderr) + "\n"
+        except KeyboardInterrupt:
+            process.send_signal(signal.SIGINT)
+            continue
+        except EOFError:
+            break
+        try:
+            process.stdin.write(raw.encode(encoding))
+        except BrokenPipeError:
+            break
 
-        # Close and wait process streams
-        process.stdin.close()
-        future.exception()
+    # Close and wait process streams
+    process.stdin.close()
+    thread.join()
 
     # Wait process and return code
     return process.wait()
 
 
-def wait_for_prompt(src, dest, prompt_control, buffersize=1):
-    def read():
-        value = src.read(buffersize)
+class PromptReader:
+    """Forward the output of a subprocess and extract its prompts.
+
+    The output is relayed as bytes, in large chunks, and the text following
+    a prompt is kept for the next call, exactly as if it had not been read yet.
+    """
+
+    def __init__(
+        self, src, dest, prompt_control, buffersize=64 * 1024, encoding="utf-8"
+    ):
+        self.src = src
+        self.dest = dest
+        self.buffersize = buffersize
+        self.encoding = encoding
+        self.pending = b""
+        # UTF-8 is self-synchronizing, so the encoded control can't match
+        # the middle of another character
+        self.prompt_control = prompt_control.encode(encoding)
+        # Text destinations without binary buffer need a decoder
+        self.buffer = getattr(dest, "buffer", None)
+        if self.buffer is None:
+            self.decoder = codecs.getincrementaldecoder(encoding)("replace")
+
+    def read(self):
+        value = os.read(self.src.fileno(), self.buffersize)
         if value:
             return value
+        # Forward the pending output at the end of the stream
+        self.write(self.pending)
+        self.pending = b""
         raise EOFError
 
-    def write(arg):
-        if arg:
-            dest.write(arg)
-            dest.flush()
+    def write(self, arg):
+        if not arg:
+            return
+        if self.buffer is None:
+            self.dest.write(self.decoder.decode(arg))
+            self.dest.flush()
+            return
+        # Flush the text layer first to preserve the order of the writes
+        self.dest.flush()
+        self.buffer.write(arg)
+        self.buffer.flush()
+
+    def wait_for_prompt(self):
+        # Prevent exception in macOS with large output (issue #42)
+        if compat.platform == "darwin":
+            fcntl.fcntl(self.dest.fileno(), fcntl.F_SETFL, 0)
+
+        # The control might be split between two chunks
+        keep = len(self.prompt_control) - 1
+
+        # Wait for first prompt control
+        while self.prompt_control not in self.pending:
+            index = max(len(self.pending) - keep, 0)
+            self.write(self.pending[:index])
+            self.pending = self.pending[index:]
+            self.pending += self.read()
+
+        preprompt, _, self.pending = self.pending.partition(self.prompt_control)
+        self.write(preprompt)
+
+        # Wait for second prompt control
+        start = 0
+        while self.pending.find(self.prompt_control, start) < 0:
+            start = max(len(self.pending) - keep, 0)
+            self.pending += self.read()
+
+        prompt, _, self.pending = self.pending.partition(self.prompt_control)
+        return prompt.decode(self.encoding)
+
+    def relay(self, prompts):
+        """Forward the output until the end of the stream, queuing the prompts.
+
+        The output keeps being forwarded while the user types, and the end of
+        the stream is signaled with None.
+        """
+        try:
+            while True:
+                prompts.put(self.wait_for_prompt())
+        except EOFError:
+            pass
+        finally:
+            prompts.put(None)
 
-    # Prevent exception in macOS with large output (issue #42)
-    if compat.platform == "darwin":
-        fcntl.fcntl(dest.fileno(), fcntl.F_SETFL, 0)
 
-    # Wait for first prompt control
-    while True:
-        current = read()
-        if prompt_control in current:
-            break
-        write(current)
+def wait_for_prompt(src, dest, prompt_control, buffersize=1):
+    reader = PromptReader(src, dest, prompt_control, buffersize)
+    return reader.wait_for_prompt()
+
+
+class ReadlineThread:
+    """Run readline in a dedicated thread, on behalf of an event loop.
+
+    The prompts are sent to the thread through a queue, and the lines come back
+    as future results. Note that a line being edited can't be interrupted:
+    if the waiting coroutine gets cancelled, the line is discarded once entered.
+    """
+
+    def __init__(self, use_stderr=True):
+        self.use_stderr = use_stderr
+        self.requests = queue.Queue()
+        self.thread = None
+
+    async def input(self, prompt=""):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        future = asyncio.get_running_loop().create_future()
+        self.requests.put((prompt, future))
+        return await future
+
+    def _run(self):
+        # Let the main thread handle the interruptions
+        if hasattr(signal, "pthread_sigmask"):
+            signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT})
+        while True:
+            prompt, future = self.requests.get()
+            try:
+                result = input(prompt, use_stderr=self.use_stderr)
+            except Exception as exc:
+                callback = _set_exception_unless_done
+                result = exc
+            else:
+                callback = _set_result_unless_done
+            try:
+                future.get_loop().call_soon_threadsafe(callback, future, result)
+            except RuntimeError:  # pragma: no cover
+                pass  # The loop is closed
 
-    preprompt, current = current.split(prompt_control, 1)
-    write(preprompt)
 
-    # Wait for second prompt control
-    while prompt_control not in current:
-        current += read()
+def _set_result_unless_done(future, result):
+    if not future.done():
+        future.set_result(result)
 
-    prompt, postprompt = current.split(prompt_control, 1)
-    write(postprompt)
 
-    return prompt
+def _set_exception_unless_done(future, exc):
+    if not future.done():
+        future.set_exception(exc)
 
 
 def input(prompt="", use_stderr=False):
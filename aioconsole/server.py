@@ -5,14 +5,110 @@ import socket
 from functools import partial
 
 from . import compat
+from . import stream
 from . import console
+from . import execute
 
 
-async def handle_connect(reader, writer, factory, banner=None):
-    streams = reader, writer
-    interface = factory(streams=streams)
-    await interface.interact(banner=banner, stop=False, handle_sigint=False)
+class SessionStats:
+    """Counters for the sessions of an interactive server."""
+
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.active = 0
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(accepted={self.accepted}, "
+            f"rejected={self.rejected}, timed_out={self.timed_out}, "
+            f"active={self.active})"
+        )
+
+
+class SessionStreamReader(asyncio.StreamReader):
+    """Stream reader raising a timeout error when the client stays idle."""
+
+    def __init__(self, *, idle_timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.idle_timeout = idle_timeout
+
+    async def _wait_for_data(self, func_name):
+        coro = super()._wait_for_data(func_name)
+        await asyncio.wait_for(coro, self.idle_timeout)
+
+
+async def handle_connect(
+    reader,
+    writer,
+    factory,
+    banner=None,
+    sessions=None,
+    lazy=False,
+    *,
+    max_clients=None,
+    session_timeout=None,
+    write_buffer_limits=None,
+    stats=None,
+):
+    if stats is None:
+        stats = SessionStats()
+    # Disconnect right away when there are too many clients
+    if max_clients is not None and stats.active >= max_clients:
+        stats.rejected += 1
+        writer.close()
+        return
+    stats.accepted += 1
+    stats.active += 1
+    # Slow clients apply backpressure to their console
+    if write_buffer_limits is not None:
+        high, low = stream.get_write_buffer_limits(write_buffer_limits)
+        writer.transport.set_write_buffer_limits(high=high, low=low)
+    try:
+        # Queue the connection until a session is available
+        if sessions is not None:
+            await sessions.acquire()
+        try:
+            # Only build the console once the client has sent something
+            if lazy and not reader._buffer and not reader.at_eof():
+                await reader._wait_for_data("handle_connect")
+            if lazy and reader.at_eof():
+                return
+            streams = reader, writer
+            interface = factory(streams=streams)
+            coro = interface.interact(banner=banner, stop=False, handle_sigint=False)
+            await run_session(coro, reader, writer, session_timeout)
+        finally:
+            if sessions is not None:
+                sessions.release()
+    # Idle or session timeout
+    except asyncio.TimeoutError:
+        stats.timed_out += 1
+    finally:
+        stats.active -= 1
+        writer.close()
+
+
+async def run_session(coro, reader, writer, timeout=None):
+    """Run a session, and disconnect the client once the timeout expires."""
+    task = asyncio.ensure_future(coro)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if done:
+        return task.result()
+    # The console swallows the cancellation of the running code,
+    # so also make sure it reaches EOF when it reads the next line
     writer.close()
+    reader.feed_eof()
+    task.cancel()
+    await asyncio.wait({task})
+    if not task.cancelled():
+        task.exception()
+    raise asyncio.TimeoutError
 
 
 async def start_interactive_server(
@@ -23,20 +119,46 @@ async def start_interactive_server(
     banner=None,
     *,
     loop=None,
+    max_sessions=None,
+    lazy=False,
+    max_clients=None,
+    idle_timeout=None,
+    session_timeout=None,
+    write_buffer_limits=None,
+    stats=None,
 ):
     if compat.platform == "win32" and port is None:
         raise ValueError("A TCP port should be provided")
     if (port is None) == (path is None):
         raise ValueError("Either a TCP port or a UDS path should be provided")
+    if loop is None:
+        loop = asyncio.get_event_loop()
     if port is not None:
         # Override asyncio behavior (i.e serve on all interfaces by default)
         host = host or "localhost"
-        start_server = partial(asyncio.start_server, host=host, port=port)
+        create_server = partial(loop.create_server, host=host, port=port)
     else:
-        start_server = partial(asyncio.start_unix_server, path=path)
+        create_server = partial(loop.create_unix_server, path=path)
+
+    sessions = None if max_sessions is None else asyncio.Semaphore(max_sessions)
+    client_connected = partial(
+        handle_connect,
+        factory=factory,
+        banner=banner,
+        sessions=sessions,
+        lazy=lazy,
+        max_clients=max_clients,
+        session_timeout=session_timeout,
+        write_buffer_limits=write_buffer_limits,
+        stats=SessionStats() if stats is None else stats,
+    )
+
+    # Same as `asyncio.start_server`, with a session stream reader
+    def protocol_factory():
+        reader = SessionStreamReader(idle_timeout=idle_timeout)
+        return asyncio.StreamReaderProtocol(reader, client_connected)
 
-    client_connected = partial(handle_connect, factory=factory, banner=banner)
-    server = await start_server(client_connected)
+    server = await create_server(protocol_factory)
     return server
 
 
@@ -50,18 +172,51 @@ async def start_console_server(
     prompt_control=None,
     *,
     loop=None,
+    bulk_input=False,
+    max_sessions=None,
+    lazy=False,
+    max_clients=None,
+    idle_timeout=None,
+    session_timeout=None,
+    write_buffer_limits=None,
+    stats=None,
 ):
+    """Serve python consoles sharing the given locals.
+
+    Each session reads through the shared namespace and writes to its own
+    copy-on-write namespace: assigning or deleting a name in a session does
+    not affect the other sessions. Note that the namespace is not copied
+    when a session starts, but running a statement still goes over all the
+    visible names.
+    """
+
+    # The sessions share the given namespace, and write to their own
     def factory(streams):
-        client_locals = dict(locals) if locals is not None else None
+        client_locals = None
+        if locals is not None:
+            client_locals = execute.CopyOnWriteNamespace(locals)
         return console.AsynchronousConsole(
             streams=streams,
             locals=client_locals,
             filename=filename,
             prompt_control=prompt_control,
+            bulk_input=bulk_input,
         )
 
     server = await start_interactive_server(
-        factory, host=host, port=port, path=path, banner=banner, loop=loop
+        factory,
+        host=host,
+        port=port,
+        path=path,
+        banner=banner,
+        loop=loop,
+        max_sessions=max_sessions,
+        lazy=lazy,
+        max_clients=max_clients,
+        idle_timeout=idle_timeout,
+        session_timeout=session_timeout,
+        write_buffer_limits=write_buffer_limits,
+        stats=stats,
     )
     return server
 
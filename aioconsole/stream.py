@@ -1,5 +1,6 @@
 """Provide an asynchronous equivalent to *input*."""
 
+import io
 import os
 import sys
 import stat
@@ -7,11 +8,20 @@ import weakref
 import asyncio
 import selectors
 from collections import deque
-from threading import Thread
-from concurrent.futures import Future
+from threading import Thread, Event, Semaphore
+from concurrent.futures import ThreadPoolExecutor
 
 from . import compat
 
+PREFETCH_LINES = 64
+MAX_BATCH_SIZE = 64 * 1024
+WRITE_BUFFER_LIMITS = {
+    # Wait for the data to be written on every drain
+    "latency": (0, 0),
+    # Only wait when the write buffer gets too large
+    "throughput": (64 * 1024, 16 * 1024),
+}
+
 
 class ProtectedPipe:
     """Wrapper to protect a pipe from being closed."""
@@ -50,32 +60,20 @@ def is_pipe_transport_compatible(pipe):
     return True
 
 
-async def run_as_daemon(func, *args):
-    future = Future()
-    future.set_running_or_notify_cancel()
-
-    # A bug in python 3.7 makes it a bad idea to set a BaseException
-    # in a wrapped future (see except statement in asyncio.Task.__wakeup)
-    # Instead, we'll wrap base exceptions into exceptions and unwrap them
-    # on the other side of the call.
-    class BaseExceptionWrapper(Exception):
-        pass
+def is_regular_file(pipe):
+    try:
+        fileno = pipe.fileno()
+    except (OSError, AttributeError, ValueError):
+        return False
+    return stat.S_ISREG(os.fstat(fileno).st_mode)
 
-    def daemon():
-        try:
-            result = func(*args)
-        except Exception as e:
-            future.set_exception(e)
-        except BaseException as e:
-            future.set_exception(BaseExceptionWrapper(e))
-        else:
-            future.set_result(result)
 
-    Thread(target=daemon, daemon=True).start()
+def has_buffered_data(pipe):
+    # The file descriptor is ahead of the file object if some data is buffered
     try:
-        return await asyncio.wrap_future(future)
-    except BaseExceptionWrapper as exc:
-        raise exc.args[0]
+        return pipe.tell() != os.lseek(pipe.fileno(), 0, os.SEEK_CUR)
+    except (OSError, AttributeError, ValueError):
+        return True
 
 
 class StandardStreamReaderProtocol(asyncio.StreamReaderProtocol):
@@ -96,6 +94,10 @@ class StandardStreamReaderProtocol(asyncio.StreamReaderProtocol):
 
 
 class StandardStreamReader(asyncio.StreamReader):
+    def close(self):
+        if self._transport is not None:
+            self._transport.close()
+
     async def readuntil(self, separator=b"\n"):
         # Re-implement `readuntil` to work around self._limit.
         # The limit is still useful to prevent the internal buffer
@@ -113,6 +115,41 @@ class StandardStreamReader(asyncio.StreamReader):
                     return bytes(chunk)
                 await self._wait_for_data("readuntil")
 
+    async def readline_chunks(self, chunk_size=None, separator=b"\n"):
+        """Iterate over the next line as a sequence of bounded chunks.
+
+        Unlike `readline`, this keeps the buffer bounded regardless of
+        the line length. The last chunk ends with the separator, unless
+        EOF is reached first. Chunks are at most `chunk_size` bytes long,
+        the stream limit being used by default.
+        """
+        if chunk_size is None:
+            chunk_size = self._limit
+        while True:
+            if self._exception is not None:
+                raise self._exception
+            # Look for a separator starting within the chunk, so that a
+            # separator is never split between two chunks
+            end = chunk_size + len(separator) - 1
+            index = self._buffer.find(separator, 0, end)
+            if index == 0 or 0 < index <= chunk_size - len(separator):
+                size = index + len(separator)
+            elif index > 0:
+                size = index
+            elif len(self._buffer) >= end or self._eof:
+                size = min(len(self._buffer), chunk_size)
+            else:
+                await self._wait_for_data("readline_chunks")
+                continue
+            if size == 0:
+                return
+            chunk = bytes(self._buffer[:size])
+            del self._buffer[:size]
+            self._maybe_resume_transport()
+            yield chunk
+            if chunk.endswith(separator):
+                return
+
 
 class StandardStreamWriter(asyncio.StreamWriter):
     def __del__(self):
@@ -133,35 +170,220 @@ class StandardStreamWriter(asyncio.StreamWriter):
             data = data.encode()
         super().write(data)
 
+    def writelines(self, lines):
+        super().writelines(
+            [data.encode() if isinstance(data, str) else data for data in lines]
+        )
+
+    # Number of flushes in progress, and the limits to restore afterwards
+    _flushing = 0
+    _flushed_limits = None
+
+    async def flush(self):
+        """Wait until the write buffer is empty, regardless of the limits."""
+        if not self._flushing:
+            self._flushed_limits = self.transport.get_write_buffer_limits()
+            self.transport.set_write_buffer_limits(high=0, low=0)
+        self._flushing += 1
+        try:
+            await self.drain()
+        finally:
+            self._flushing -= 1
+            if not self._flushing:
+                low, high = self._flushed_limits
+                self.transport.set_write_buffer_limits(high=high, low=low)
+
+
+class FileReadTransport(asyncio.ReadTransport):
+    """Read transport for regular files, which cannot be used with selectors.
+
+    The file is read by chunks in a dedicated thread, and the reading is
+    paused and resumed by the stream reader flow control.
+    """
+
+    def __init__(self, loop, pipe, protocol, chunk_size=MAX_BATCH_SIZE):
+        super().__init__({"pipe": pipe})
+        self._loop = loop
+        self._fileno = pipe.fileno()
+        self._protocol = protocol
+        self._chunk_size = chunk_size
+        self._closing = False
+        self._resumed = asyncio.Event()
+        self._resumed.set()
+        self._protocol.connection_made(self)
+        self._task = asyncio.ensure_future(self._read_loop())
+
+    async def _read_loop(self):
+        while True:
+            await self._resumed.wait()
+            if self._closing:
+                return
+            try:
+                data = await self._loop.run_in_executor(
+                    get_executor("reader"), os.read, self._fileno, self._chunk_size
+                )
+            except OSError as exc:
+                self._closing = True
+                self._protocol.connection_lost(exc)
+                return
+            if self._closing:
+                return
+            if not data:
+                break
+            self._protocol.data_received(data)
+        self._protocol.eof_received()
+        self.close()
+
+    def is_reading(self):
+        return not self._closing and self._resumed.is_set()
+
+    def pause_reading(self):
+        self._resumed.clear()
+
+    def resume_reading(self):
+        self._resumed.set()
+
+    def is_closing(self):
+        return self._closing
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+        # The read loop cannot be cancelled once the loop is closed
+        if self._loop.is_closed():
+            self._task._log_destroy_pending = False
+            return
+        self._task.cancel()
+        self._loop.call_soon(self._protocol.connection_lost, None)
+
 
 class NonFileStreamReader:
-    def __init__(self, stream, *, loop=None):
+    def __init__(self, stream, *, loop=None, prefetch=0):
         if loop is None:
             loop = asyncio.get_event_loop()
         self.loop = loop
         self.stream = stream
         self.eof = False
+        # Lines are read by a long-lived daemon thread, up to `prefetch` lines
+        # ahead of the consumer. Note that the stream cannot be closed while
+        # a line is being read. Terminals are always read on demand, so that
+        # the lines typed by the user are not stolen from a later `input()`.
+        self.prefetch = prefetch
+        self.buffer = bytearray()
+        self.lines = deque()
+        self.line_ready = None
+        self.readahead = 0
+        self.requested = False
+        self.credits = None
+        self.worker = None
+        self.worker_finalizer = None
 
     def at_eof(self):
         return self.eof
 
-    async def readline(self):
+    def close(self):
+        if self.worker is not None:
+            self.worker_finalizer()
+            self.worker = None
+
+    def _start_worker(self):
         try:
-            data = await run_as_daemon(self.stream.readline)
+            readline = self.stream.readline
         except AttributeError:
             raise RuntimeError("ainput(): lost sys.stdin")
-        if isinstance(data, str):
-            data = data.encode()
+        if self.line_ready is None:
+            self.line_ready = asyncio.Event()
+        try:
+            isatty = self.stream.isatty()
+        except (AttributeError, ValueError, OSError):
+            isatty = False
+        self.readahead = 0 if isatty else self.prefetch
+        self.requested = False
+        self.credits = Semaphore(self.readahead)
+        stopped = Event()
+        self.worker = Thread(
+            target=_nonfile_stream_reader_thread_target,
+            args=(
+                readline,
+                asyncio.get_running_loop(),
+                self.lines,
+                self.line_ready,
+                self.credits,
+                stopped,
+            ),
+            daemon=True,
+        )
+        self.worker.start()
+        self.worker_finalizer = weakref.finalize(
+            self, _stop_nonfile_stream_reader_thread, self.credits, stopped
+        )
+
+    def _pop_line(self):
+        data = self.lines.popleft()
+        if self.readahead:
+            self.credits.release()
+        # The worker stops after EOF or an error, and is restarted on demand
+        if not isinstance(data, bytes) or not data:
+            self.worker = None
+            self.worker_finalizer.detach()
+        if isinstance(data, AttributeError):
+            raise RuntimeError("ainput(): lost sys.stdin") from data
+        if isinstance(data, BaseException):
+            raise data
+        return data
+
+    async def _get_line(self):
+        if self.buffer:
+            data = bytes(self.buffer)
+            self.buffer.clear()
+            return data
+        if self.worker is None:
+            self._start_worker()
+        if not self.readahead and not self.requested and not self.lines:
+            self.requested = True
+            self.credits.release()
+        while not self.lines:
+            self.line_ready.clear()
+            await self.line_ready.wait()
+        self.requested = False
+        return self._pop_line()
+
+    def _has_buffered_line(self):
+        if self.buffer:
+            return self.buffer.endswith(b"\n")
+        if not self.lines:
+            return False
+        data = self.lines[0]
+        return isinstance(data, bytes) and data.endswith(b"\n")
+
+    async def readline(self):
+        data = await self._get_line()
         self.eof = not data
         return data
 
     async def read(self, n=-1):
+        if n == 0:
+            return b""
+        if n > 0:
+            if not self.buffer:
+                self.buffer += await self._get_line()
+            data = bytes(self.buffer[:n])
+            del self.buffer[:n]
+            self.eof = not data
+            return data
+        chunks = []
         try:
-            data = await run_as_daemon(self.stream.read, n)
-        except AttributeError:
-            raise RuntimeError("ainput(): lost sys.stdin")
-        if isinstance(data, str):
-            data = data.encode()
+            while True:
+                data = await self._get_line()
+                if not data:
+                    break
+                chunks.append(data)
+        except BaseException:
+            # Do not lose the lines read so far
+            self.buffer[:0] = b"".join(chunks)
+            raise
+        data = b"".join(chunks)
         self.eof = not data
         return data
 
@@ -175,29 +397,76 @@ class NonFileStreamReader:
         return val
 
 
+def _nonfile_stream_reader_thread_target(
+    readline, loop, lines, line_ready, credits, stopped
+):
+    def deliver(data):
+        lines.append(data)
+        line_ready.set()
+
+    while True:
+        credits.acquire()
+        if stopped.is_set():
+            return
+        # Errors, including base exceptions, are passed on to the consumer
+        try:
+            data = readline()
+        except BaseException as exc:
+            data = exc
+        else:
+            if isinstance(data, str):
+                data = data.encode()
+        try:
+            loop.call_soon_threadsafe(deliver, data)
+        except RuntimeError:
+            # The loop is closed
+            return
+        if not isinstance(data, bytes) or not data:
+            return
+
+
+def _stop_nonfile_stream_reader_thread(credits, stopped):
+    stopped.set()
+    credits.release()
+
+
 class NonFileStreamWriter:
-    def __init__(self, stream, *, loop=None):
+    def __init__(self, stream, *, loop=None, max_batch_size=MAX_BATCH_SIZE):
         if loop is None:
             loop = asyncio.get_event_loop()
         self.loop = loop
         self.stream = stream
+        self.max_batch_size = max_batch_size
         self.buffer = deque()
         self.write_task = None
         self.task_finalizer = None
 
     def write(self, data):
+        self.writelines((data,))
+
+    def writelines(self, lines):
+        # Bytes usually come from encoded text, so they go through the text layer
+        self._extend(
+            data if isinstance(data, str) else bytes(data).decode() for data in lines
+        )
+
+    def write_raw(self, lines):
+        """Write bytes-like objects directly to the binary buffer of the stream."""
+        self._extend(bytes(data) for data in lines)
+
+    def _extend(self, lines):
         if self.stream is None:
             raise RuntimeError("This writer stream is already closed")
-        if isinstance(data, bytes):
-            data = data.decode()
-        self.buffer.append(data)
+        self.buffer.extend(lines)
         if self.write_task is not None and not self.write_task.done():
             return
         if self.write_task is not None and self.write_task.done():
             self.write_task = None
             self.task_finalizer()
         self.write_task = asyncio.ensure_future(
-            _nonfile_stream_writer_task_target(self.buffer, self.stream)
+            _nonfile_stream_writer_task_target(
+                self.buffer, self.stream, self.max_batch_size
+            )
         )
         self.task_finalizer = weakref.finalize(self, self.write_task.result)
 
@@ -209,6 +478,9 @@ class NonFileStreamWriter:
                 self.write_task = None
                 self.task_finalizer.detach()
 
+    async def flush(self):
+        await self.drain()
+
     def close(self):
         self.stream = None
 
@@ -219,18 +491,81 @@ class NonFileStreamWriter:
         await self.drain()
 
 
-async def _nonfile_stream_writer_task_target(data_buffer, stream):
+# Dedicated executors, indexed by name
+EXECUTORS = {}
+
+
+def get_executor(name):
+    """Return the dedicated single-thread executor with the given name.
+
+    Using a dedicated thread preserves the order of the operations and
+    prevents the standard streams from being starved by a busy default
+    executor.
+    """
+    if EXECUTORS.get(name) is None:
+        EXECUTORS[name] = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"aioconsole-{name}"
+        )
+    return EXECUTORS[name]
+
+
+def shutdown_executors():
+    """Shut the dedicated executors down, they are re-created on demand."""
+    while EXECUTORS:
+        _, executor = EXECUTORS.popitem()
+        executor.shutdown(wait=False)
+
+
+async def _nonfile_stream_writer_task_target(data_buffer, stream, max_batch_size):
     loop = asyncio.get_event_loop()
     while data_buffer:
-        data = data_buffer.popleft()
-        await loop.run_in_executor(None, stream.write, data)
+        # Coalesce the pending chunks of the same kind into a single write
+        is_text = isinstance(data_buffer[0], str)
+        chunks = [data_buffer.popleft()]
+        size = len(chunks[0])
+        while (
+            data_buffer
+            and size < max_batch_size
+            and isinstance(data_buffer[0], str) == is_text
+        ):
+            chunks.append(data_buffer.popleft())
+            size += len(chunks[-1])
+        if is_text:
+            args = stream.write, "".join(chunks)
+        else:
+            args = _write_bytes, stream, b"".join(chunks)
+        await loop.run_in_executor(get_executor("writer"), *args)
     if hasattr(stream, "flush"):
-        await loop.run_in_executor(None, stream.flush)
+        await loop.run_in_executor(get_executor("writer"), stream.flush)
+
+
+def _write_bytes(stream, data):
+    buffer = getattr(stream, "buffer", None)
+    if buffer is None:
+        stream.write(data.decode())
+        return
+    # Flush the text layer first to preserve the order of the writes
+    stream.flush()
+    buffer.write(data)
+
+
+def get_write_buffer_limits(limits):
+    """Return the (high, low) write buffer limits for a profile or a tuple."""
+    if isinstance(limits, str):
+        try:
+            return WRITE_BUFFER_LIMITS[limits]
+        except KeyError:
+            raise ValueError(f"Unknown write buffer profile: {limits!r}")
+    high, low = limits
+    return high, low
 
 
-async def open_standard_pipe_connection(pipe_in, pipe_out, pipe_err, *, loop=None):
+async def open_standard_pipe_connection(
+    pipe_in, pipe_out, pipe_err, *, loop=None, write_buffer_limits="latency"
+):
     if loop is None:
         loop = asyncio.get_event_loop()
+    high, low = get_write_buffer_limits(write_buffer_limits)
 
     # Reader
     in_reader = StandardStreamReader(loop=loop)
@@ -249,36 +584,124 @@ async def open_standard_pipe_connection(pipe_in, pipe_out, pipe_err, *, loop=Non
     )
     err_writer = StandardStreamWriter(err_transport, protocol, in_reader, loop)
 
-    # Set the write buffer limits to zero
+    # Set the write buffer limits, zero by default
     # This way, `await stream.drain()` can be used to make sure the buffer is flushed
-    out_transport.set_write_buffer_limits(high=0, low=0)
-    err_transport.set_write_buffer_limits(high=0, low=0)
+    out_transport.set_write_buffer_limits(high=high, low=low)
+    err_transport.set_write_buffer_limits(high=high, low=low)
 
     # Return
     return in_reader, out_writer, err_writer
 
 
-async def create_standard_streams(stdin, stdout, stderr, *, loop=None):
+async def open_file_reader(pipe, *, loop=None):
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    reader = StandardStreamReader(loop=loop)
+    protocol = StandardStreamReaderProtocol(reader, loop=loop)
+    FileReadTransport(loop, pipe, protocol)
+    return reader
+
+
+async def create_standard_streams(
+    stdin, stdout, stderr, *, loop=None, write_buffer_limits="latency"
+):
     if all(map(is_pipe_transport_compatible, (stdin, stdout, stderr))):
-        return await open_standard_pipe_connection(stdin, stdout, stderr, loop=loop)
+        return await open_standard_pipe_connection(
+            stdin, stdout, stderr, loop=loop, write_buffer_limits=write_buffer_limits
+        )
+    # Non-file writers are always fully flushed on drain
+    get_write_buffer_limits(write_buffer_limits)
+    # The file is read directly, unless some data is still buffered in `stdin`
+    if is_regular_file(stdin) and not has_buffered_data(stdin):
+        reader = await open_file_reader(stdin, loop=loop)
+    else:
+        reader = NonFileStreamReader(stdin, loop=loop, prefetch=PREFETCH_LINES)
     return (
-        NonFileStreamReader(stdin, loop=loop),
+        reader,
         NonFileStreamWriter(stdout, loop=loop),
         NonFileStreamWriter(stderr, loop=loop),
     )
 
 
-async def get_standard_streams(*, cache={}, use_stderr=False, loop=None):
+# Standard streams for each loop, indexed by (stdin, stdout, stderr)
+STANDARD_STREAMS = {}
+
+
+async def get_standard_streams(
+    *, use_stderr=False, loop=None, write_buffer_limits=None
+):
+    """Return the standard streams of the given loop, creating them if needed.
+
+    The write buffer limits only apply when the streams get created, since
+    the streams are shared by all the callers.
+    """
     if loop is None:
         loop = asyncio.get_event_loop()
-    args = sys.stdin, sys.stdout, sys.stderr
-    key = args, loop
-    if cache.get(key) is None:
-        cache[key] = await create_standard_streams(*args, loop=loop)
-    in_reader, out_writer, err_writer = cache[key]
+    if write_buffer_limits is not None:
+        get_write_buffer_limits(write_buffer_limits)
+    # The streams keep a reference to their loop, so closed loops are
+    # dropped from the registry here rather than through weak references
+    for closed_loop in [key for key in STANDARD_STREAMS if key.is_closed()]:
+        close_standard_streams(loop=closed_loop)
+    registry = STANDARD_STREAMS.setdefault(loop, {})
+    key = sys.stdin, sys.stdout, sys.stderr
+    if registry.get(key) is None:
+        registry[key] = await create_standard_streams(
+            *key, loop=loop, write_buffer_limits=write_buffer_limits or "latency"
+        )
+    in_reader, out_writer, err_writer = registry[key]
     return in_reader, err_writer if use_stderr else out_writer
 
 
+def close_standard_streams(*, loop=None):
+    """Close the standard streams created for the given loop.
+
+    The underlying standard files are left open.
+    """
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    for streams in STANDARD_STREAMS.pop(loop, {}).values():
+        for stream in streams:
+            # The transports cannot be closed properly once the loop is closed
+            try:
+                stream.close()
+            except RuntimeError:
+                pass
+    # The executor threads are no longer needed
+    if not STANDARD_STREAMS:
+        shutdown_executors()
+
+
+def has_buffered_line(reader):
+    """Check whether a complete line is already buffered in the given reader."""
+    if isinstance(reader, asyncio.StreamReader):
+        return b"\n" in reader._buffer
+    if isinstance(reader, NonFileStreamReader):
+        return reader._has_buffered_line()
+    return False
+
+
+def read_buffered_line(reader):
+    """Read a line already buffered in the given reader, without waiting.
+
+    Return None if no complete line is available.
+    """
+    if not has_buffered_line(reader):
+        return None
+    if isinstance(reader, NonFileStreamReader):
+        if reader.buffer:
+            data = bytes(reader.buffer)
+            reader.buffer.clear()
+        else:
+            data = reader._pop_line()
+        return data.decode().rstrip("\n")
+    index = reader._buffer.index(b"\n") + 1
+    data = bytes(reader._buffer[:index])
+    del reader._buffer[:index]
+    reader._maybe_resume_transport()
+    return data.decode().rstrip("\n")
+
+
 async def ainput(prompt="", *, streams=None, use_stderr=False, loop=None):
     """Asynchronous equivalent to *input*."""
     # Get standard streams
@@ -298,16 +721,176 @@ async def ainput(prompt="", *, streams=None, use_stderr=False, loop=None):
     return data.rstrip("\n")
 
 
+async def alines(*, streams=None, loop=None):
+    """Asynchronous iterator over the lines of the standard input.
+
+    The lines are decoded and stripped of their trailing newline, like with
+    *ainput*. The last line is yielded even if it has no trailing newline.
+    """
+    # Get standard streams
+    if streams is None:
+        streams = await get_standard_streams(loop=loop)
+    reader, _ = streams
+    # Generic readers
+    if not isinstance(reader, asyncio.StreamReader):
+        async for data in reader:
+            yield data.decode().rstrip("\n")
+        return
+    # Split all the complete lines available in the buffer at once
+    scanned = 0
+    while True:
+        if reader._exception is not None:
+            raise reader._exception
+        buffer = reader._buffer
+        index = buffer.rfind(b"\n", scanned)
+        if index >= 0:
+            chunk = bytes(buffer[: index + 1])
+            scanned = 0
+            for line in chunk.split(b"\n")[:-1]:
+                # Only consume the lines actually delivered
+                del buffer[: len(line) + 1]
+                reader._maybe_resume_transport()
+                yield line.decode()
+            continue
+        if reader._eof:
+            if buffer:
+                yield bytes(buffer).decode()
+                buffer.clear()
+            return
+        # Only scan the new data on the next wakeup
+        scanned = len(buffer)
+        await reader._wait_for_data("alines")
+
+
 async def aprint(
-    *values, sep=None, end="\n", flush=True, streams=None, use_stderr=False, loop=None
+    *values,
+    sep=None,
+    end="\n",
+    flush=True,
+    streams=None,
+    use_stderr=False,
+    loop=None,
+    write_buffer_limits=None,
 ):
-    """Asynchronous equivalent to *print*."""
+    """Asynchronous equivalent to *print*.
+
+    The write buffer limits are only used if the standard streams have not
+    been created yet (see *get_standard_streams*).
+    """
     # Get standard streams
+    if streams is None:
+        streams = await get_standard_streams(
+            use_stderr=use_stderr, loop=loop, write_buffer_limits=write_buffer_limits
+        )
+    _, writer = streams
+
+    # Write the formatted values at once
+    writer.write(format_print(*values, sep=sep, end=end))
+
+    if flush:
+        await writer.drain()
+
+
+async def awrite(data, *, flush=True, streams=None, use_stderr=False, loop=None):
+    """Write bytes (or any bytes-like object) to the standard output."""
     if streams is None:
         streams = await get_standard_streams(use_stderr=use_stderr, loop=loop)
     _, writer = streams
+    _write_raw(writer, (data,))
+    if flush:
+        await writer.drain()
 
-    print(*values, sep=sep, end=end, flush=False, file=writer)
 
+async def awritelines(lines, *, flush=True, streams=None, use_stderr=False, loop=None):
+    """Write an iterable of bytes-like objects to the standard output."""
+    if streams is None:
+        streams = await get_standard_streams(use_stderr=use_stderr, loop=loop)
+    _, writer = streams
+    _write_raw(writer, lines)
     if flush:
         await writer.drain()
+
+
+def _write_raw(writer, lines):
+    # Non-file writers decode bytes written through the usual methods
+    if isinstance(writer, NonFileStreamWriter):
+        writer.write_raw(lines)
+    else:
+        writer.writelines(lines)
+
+
+def format_print(*values, sep=None, end="\n"):
+    """Format the given values the same way *print* does."""
+    buffer = io.StringIO()
+    print(*values, sep=sep, end=end, file=buffer)
+    return buffer.getvalue()
+
+
+class AsyncPrinter:
+    """Buffered equivalent to *aprint*.
+
+    The printed values are accumulated in memory and written to the stream
+    once the buffer exceeds `max_size` characters, or `max_delay` seconds
+    after the first value is buffered. Use `flush` or `aclose` (or the async
+    context manager) to write and drain the remaining data.
+    """
+
+    def __init__(
+        self,
+        *,
+        streams=None,
+        use_stderr=False,
+        loop=None,
+        max_size=MAX_BATCH_SIZE,
+        max_delay=0.1,
+    ):
+        self.streams = streams
+        self.use_stderr = use_stderr
+        self.loop = loop
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.buffer = []
+        self.size = 0
+        self.timer = None
+
+    async def get_writer(self):
+        if self.streams is None:
+            self.streams = await get_standard_streams(
+                use_stderr=self.use_stderr, loop=self.loop
+            )
+        _, writer = self.streams
+        return writer
+
+    async def print(self, *values, sep=None, end="\n", flush=False):
+        writer = await self.get_writer()
+        data = format_print(*values, sep=sep, end=end)
+        self.buffer.append(data)
+        self.size += len(data)
+        if flush or self.size >= self.max_size:
+            await self.flush()
+        elif self.timer is None:
+            loop = asyncio.get_running_loop()
+            self.timer = loop.call_later(self.max_delay, self.write, writer)
+
+    def write(self, writer):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.buffer:
+            writer.write("".join(self.buffer))
+            self.buffer.clear()
+            self.size = 0
+
+    async def flush(self):
+        writer = await self.get_writer()
+        self.write(writer)
+        await writer.drain()
+
+    async def aclose(self):
+        await self.flush()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
@@ -1,5 +1,7 @@
 import io
+import os
 import sys
+import queue
 from contextlib import contextmanager
 
 from unittest.mock import Mock, patch, call
@@ -76,13 +78,15 @@ def mock_readline(platform):
                 )
 
 
-@pytest.fixture(params=["readline", "no-readline"])
+@pytest.fixture(params=["readline", "in-process", "no-readline"])
 def use_readline(request, mock_readline, platform):
     if request.param == "readline":
         # Readline tests hang on windows for some reason
         if sys.platform == "win32":
             pytest.xfail()
         return []
+    if request.param == "in-process":
+        return ["--in-process"]
     return ["--no-readline"]
 
 
@@ -233,3 +237,86 @@ def test_apython_pythonstartup(capfd, use_readline, monkeypatch, tmpdir):
     out, err = capfd.readouterr()
     assert out == outstr
     assert err == errstr
+
+
+def test_apython_command(capfd):
+    command = "import sys, asyncio\nprint(await asyncio.sleep(0, 3), sys.argv)"
+    with pytest.raises(SystemExit):
+        apython.run_apython(["-c", command, "a", "b"])
+    out, err = capfd.readouterr()
+    assert out == "3 ['-c', 'a', 'b']\n"
+    assert err == ""
+
+
+def test_apython_command_from_stdin(capfd):
+    command = "x = 1\nasync def f():\n    return x + 1\n\nprint(await f(), __name__)"
+    with patch("sys.stdin", new=io.StringIO(command)):
+        with pytest.raises(SystemExit):
+            apython.run_apython(["-c", "-"])
+    out, err = capfd.readouterr()
+    assert out == "2 __main__\n"
+    assert err == ""
+
+
+def test_apython_command_exclusive_options(capfd):
+    for args in (["-c", "1", "-m", "mod"], ["-c", "1", "--serve", "8000"]):
+        with pytest.raises(SystemExit) as ctx:
+            apython.run_apython(args)
+        assert ctx.value.code == 2
+        out, err = capfd.readouterr()
+        assert out == ""
+        assert "not allowed with argument" in err
+
+
+def test_apython_command_error(capfd):
+    with pytest.raises(SystemExit) as ctx:
+        apython.run_apython(["-c", "1 / 0"])
+    assert ctx.value.code == 1
+    out, err = capfd.readouterr()
+    assert out == ""
+    assert err.startswith("Traceback (most recent call last):\n")
+    assert 'File "<string>"' in err
+    assert "execute.py" not in err
+    assert err.endswith("ZeroDivisionError: division by zero\n")
+
+
+def test_prompt_reader():
+    read_fd, write_fd = os.pipe()
+    prompt = "\u200b>>> \u200b"
+    output = "x" * 10000 + "\u00e9" + prompt + "late" + "\u200b... \u200b"
+    with open(read_fd, "rb") as src:
+        with open(write_fd, "wb") as stream:
+            stream.write(output.encode())
+        dest = io.TextIOWrapper(io.BytesIO(), encoding="ascii")
+        # The first chunk ends in the middle of the prompt control
+        reader = rlwrap.PromptReader(src, dest, "\u200b", buffersize=10003)
+        assert reader.wait_for_prompt() == ">>> "
+        assert dest.buffer.getvalue() == b"x" * 10000 + "\u00e9".encode()
+        # The next prompt is not lost
+        assert reader.wait_for_prompt() == "... "
+        assert dest.buffer.getvalue().endswith(b"\xa9late")
+        with pytest.raises(EOFError):
+            reader.wait_for_prompt()
+
+
+def test_prompt_reader_text_destination():
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, "rb") as src:
+        with open(write_fd, "wb") as stream:
+            stream.write("\u00e9\u200b>>> \u200b".encode())
+        dest = io.StringIO()
+        reader = rlwrap.PromptReader(src, dest, "\u200b", buffersize=1)
+        assert reader.wait_for_prompt() == ">>> "
+        assert dest.getvalue() == "\u00e9"
+
+
+def test_prompt_reader_relay():
+    read_fd, write_fd = os.pipe()
+    with open(read_fd, "rb") as src:
+        with open(write_fd, "wb") as stream:
+            stream.write("\u200b>>> \u200bout\n\u200b... \u200bend\n".encode())
+        dest = io.StringIO()
+        prompts = queue.Queue()
+        rlwrap.PromptReader(src, dest, "\u200b").relay(prompts)
+        assert [prompts.get_nowait() for _ in range(3)] == [">>> ", "... ", None]
+        assert dest.getvalue() == "out\nend\n"
@@ -1,8 +1,12 @@
 import io
+import ast
+import time
+import inspect
 import asyncio
 
 import pytest
 from aioconsole import aexec, aeval
+from aioconsole import execute
 from aioconsole.execute import compile_for_aexec
 
 
@@ -30,15 +34,28 @@ testdata = {
 # Parametrized test for aexec
 
 
+@pytest.fixture(params=["statement", "batch", "namespace"])
+def strategy(request):
+    return request.param
+
+
+def pop_builtins(local, strategy):
+    # The namespace strategy behaves like exec regarding builtins
+    if strategy == "namespace":
+        assert local.pop("__builtins__") is __builtins__
+
+
 @pytest.mark.parametrize(
     "local, code, expected_result, expected_local",
     list(testdata.values()),
     ids=list(testdata.keys()),
 )
 @pytest.mark.asyncio
-async def test_aexec_exec_mode(local, code, expected_result, expected_local):
+async def test_aexec_exec_mode(local, code, expected_result, expected_local, strategy):
+    local = dict(local)
     stream = io.StringIO()
-    await aexec(code, local=local, stream=stream)
+    await aexec(code, local=local, stream=stream, strategy=strategy)
+    pop_builtins(local, strategy)
     assert stream.getvalue() == ""
     assert local == expected_local
 
@@ -49,9 +66,14 @@ async def test_aexec_exec_mode(local, code, expected_result, expected_local):
     ids=list(testdata.keys()),
 )
 @pytest.mark.asyncio
-async def test_aexec_single_mode(local, code, expected_result, expected_local):
+async def test_aexec_single_mode(
+    local, code, expected_result, expected_local, strategy
+):
+    local = dict(local)
     stream = io.StringIO()
-    await aexec(compile_for_aexec(code, "test", "single"), local=local, stream=stream)
+    trees = compile_for_aexec(code, "test", "single")
+    await aexec(trees, local=local, stream=stream, strategy=strategy)
+    pop_builtins(local, strategy)
     if expected_result is None:
         assert stream.getvalue() == ""
     else:
@@ -91,6 +113,188 @@ async def test_missing_newline():
         )
 
 
+@pytest.fixture
+def compile_calls(monkeypatch):
+    # Record the actual compilations (i.e. not the AST-only ones)
+    calls = []
+
+    def counting_compile(source, filename, mode, flags=0, *args, **kwargs):
+        if not flags & ast.PyCF_ONLY_AST:
+            calls.append(mode)
+        return compile(source, filename, mode, flags, *args, **kwargs)
+
+    monkeypatch.setattr(execute, "compile", counting_compile, raising=False)
+    cached_functions = [
+        execute.get_cached_trees,
+        execute.get_cached_batch,
+        execute.get_cached_namespace_code,
+        execute.get_cached_eval_code,
+    ]
+    for function in cached_functions:
+        function.cache_clear()
+    yield calls
+    for function in cached_functions:
+        function.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_aexec_cache(compile_calls):
+    source = "a = await coro(a + 1)\nb = a * 2"
+
+    local = {"coro": coro, "a": 0}
+    await aexec(source, local)
+    assert local == {"coro": coro, "a": 1, "b": 2}
+    assert len(compile_calls) == 2
+
+    # `b` is now part of the local names
+    await aexec(source, local)
+    assert local == {"coro": coro, "a": 2, "b": 4}
+    assert len(compile_calls) == 4
+
+    # Same source and same local names: no compilation at all
+    await aexec(source, local)
+    assert local == {"coro": coro, "a": 3, "b": 6}
+    assert len(compile_calls) == 4
+    assert execute.get_cached_trees.cache_info().misses == 2
+
+    # Different filename: the entry is not shared
+    await aexec(source, {"coro": coro, "a": 0}, filename="<other>")
+    assert execute.get_cached_trees.cache_info().misses == 3
+    assert len(compile_calls) == 6
+
+    # Syntax errors are not cached
+    for _ in range(2):
+        with pytest.raises(SyntaxError):
+            await aexec("(")
+    assert execute.get_cached_trees.cache_info().misses == 5
+
+
+@pytest.mark.asyncio
+async def test_aexec_compile_count(compile_calls):
+    size = 200
+    source = "\n".join(f"x{i} = {i} + len(dir())" for i in range(size))
+
+    # Each statement is compiled exactly once
+    local = {}
+    await aexec(source, local)
+    assert len(compile_calls) == size
+    assert local == {f"x{i}": 2 * i for i in range(size)}
+
+    # A mismatch between the expected and actual local names
+    # causes the remaining statements to be compiled again
+    compile_calls.clear()
+    local = {}
+    await aexec("b = 2\nif False: a = 1\nc = 3", local)
+    assert len(compile_calls) == 4
+    assert local == {"b": 2, "c": 3}
+
+    # The same statements with the same local names are not compiled again
+    compile_calls.clear()
+    local = {}
+    await aexec(source, local)
+    assert len(compile_calls) == 0
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_aexec_compile_count_benchmark(record_property):
+    size = 200
+    source = "\n".join(f"x{i} = {i} + len(dir())" for i in range(size))
+    execute.get_cached_trees.cache_clear()
+    for name in ["first_run", "cached_run"]:
+        start = time.perf_counter()
+        await aexec(source, {})
+        record_property(name, time.perf_counter() - start)
+
+
+@pytest.mark.asyncio
+async def test_aexec_deferred_syntax_error():
+    # The error depends on the local names given at execution time
+    local = {"x": 1}
+    trees = compile_for_aexec("global x", "test", "exec", local=local)
+    with pytest.raises(SyntaxError):
+        await aexec(trees, local)
+    await aexec(trees, {})
+
+
+@pytest.mark.asyncio
+async def test_aexec_batch_strategy(compile_calls):
+    size = 200
+    source = "\n".join(f"x{i} = {i} + len(dir())" for i in range(size))
+
+    # The whole source is compiled once
+    local = {}
+    await aexec(source, local, strategy="batch")
+    assert local == {f"x{i}": 2 * i for i in range(size)}
+    assert len(compile_calls) == 1
+    await aexec(source, {}, strategy="batch")
+    assert len(compile_calls) == 1
+
+    # The namespace is updated even if an exception is raised
+    local = {"coro": coro}
+    with pytest.raises(ZeroDivisionError):
+        await aexec("a = await coro(1)\n1/0\nb = 2", local, strategy="batch")
+    assert local == {"coro": coro, "a": 1}
+
+    # Deletion is supported
+    await aexec("del a", local, strategy="batch")
+    assert local == {"coro": coro}
+
+    # Echo in single mode
+    stream = io.StringIO()
+    trees = compile_for_aexec("1; _ + 1; x = _", "test", "single")
+    await aexec(trees, local, stream=stream, strategy="batch")
+    assert stream.getvalue() == "1\n2\n"
+    assert local == {"coro": coro, "x": 2, "_": None}
+
+    # Return and yield handling
+    with pytest.raises(SyntaxError):
+        await aexec("return 1", strategy="batch")
+    with pytest.raises(SyntaxError):
+        await aexec("yield 1", strategy="batch")
+
+
+@pytest.mark.asyncio
+async def test_aexec_namespace_strategy(compile_calls):
+    # Functions see the namespace as their global namespace
+    local = {"coro": coro}
+    source = "x = 1\ndef f(): return x\nx = await coro(2)"
+    await aexec(source, local, strategy="namespace")
+    assert local["f"]() == 2
+    local["x"] = 3
+    assert local["f"]() == 3
+    assert len(compile_calls) == 1
+
+    # The code does not depend on the namespace content
+    local.update({f"name{i}": i for i in range(1000)})
+    await aexec(source, local, strategy="namespace")
+    assert len(compile_calls) == 1
+
+    # Star imports are allowed
+    await aexec("from math import *", local, strategy="namespace")
+    assert local["pi"] > 3
+
+    # Async comprehension and await-free statements
+    stream = io.StringIO()
+    source = "[await coro(i) for i in range(3)]; x = 4; x"
+    trees = compile_for_aexec(source, "test", "single")
+    await aexec(trees, local, stream=stream, strategy="namespace")
+    assert stream.getvalue() == "[0, 1, 2]\n4\n"
+    assert local["_"] == 4
+
+    # Return and yield handling
+    with pytest.raises(SyntaxError):
+        await aexec("return 1", strategy="namespace")
+    with pytest.raises(SyntaxError):
+        await aexec("yield 1", strategy="namespace")
+
+
+@pytest.mark.asyncio
+async def test_aexec_unknown_strategy():
+    with pytest.raises(ValueError):
+        await aexec("1", strategy="unknown")
+
+
 # Test return and yield handling
 
 
@@ -251,3 +455,115 @@ async def test_aeval_coro_in_local():
     local = {"coro": aecho(10)}
     result = await aeval(expression, local)
     assert result == 10
+
+
+@pytest.mark.asyncio
+async def test_aeval_fast_path(compile_calls):
+    local = {"k": 3, "aecho": aecho}
+    for i in range(10):
+        assert await aeval("[x * k for x in range(3)]", local) == [0, 3, 6]
+        assert await aeval("await aecho(k)", local) == 3
+    # Each expression is compiled once and the namespace is left untouched
+    assert len(compile_calls) == 2
+    assert local == {"k": 3, "aecho": aecho}
+    # Only expressions using await produce a coroutine
+    code = execute.get_cached_eval_code("await aecho(k)", "<aeval>")
+    assert code.co_flags & inspect.CO_COROUTINE
+    code = execute.get_cached_eval_code("[x * k for x in range(3)]", "<aeval>")
+    assert not code.co_flags & inspect.CO_COROUTINE
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("x = 1", False),
+        ("import os", False),
+        ("def f(): return 1", False),
+        ("async def f(): await g()", False),
+        ("f = lambda: g()", False),
+        ("x = await g()", True),
+        ("async for x in g(): pass", True),
+        ("async with g(): pass", True),
+        ("[x async for x in g()]", True),
+        ("[await x for x in g()]", True),
+        ("f'{await g()}'", True),
+        ("@deco(await g())\ndef f(): pass", True),
+        ("def f(x=await g()): pass", True),
+        ("async def f() -> await g(): pass", True),
+        ("f = lambda x=await g(): x", True),
+    ],
+)
+def test_has_await(source, expected):
+    assert execute.has_await(*ast.parse(source).body) == expected
+
+
+@pytest.mark.asyncio
+async def test_aexec_await_free_functions():
+    # The await-free statements run in regular functions
+    trees = compile_for_aexec("x = 1; import os; y = len(os.sep) + x", "test", "single")
+    local = {}
+    await aexec(trees, local, stream=io.StringIO())
+    assert local["y"] == 2
+    for tree in trees:
+        function = execute.make_function_from_tree(tree, "test", {})
+        assert not inspect.iscoroutinefunction(function)
+    trees = compile_for_aexec("x = await aecho(1)", "test", "single")
+    function = execute.make_function_from_tree(trees[0], "test", {})
+    assert inspect.iscoroutinefunction(function)
+
+
+@pytest.mark.benchmark
+@pytest.mark.asyncio
+async def test_aexec_await_free_benchmark(monkeypatch, record_property):
+    cell = "x = 1; import os; y = len(os.sep) + x"
+    script = "\n".join(f"x{i} = {i} * 2" for i in range(100))
+
+    async def best_of(corofn, repeat=5, number=100):
+        results = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                await corofn()
+            results.append((time.perf_counter() - start) / number)
+        return min(results)
+
+    async def measure(prefix):
+        # Console cells are compiled in single mode
+        trees = compile_for_aexec(cell, "test", "single")
+        cell_time = await best_of(lambda: aexec(trees, {}, stream=io.StringIO()))
+        record_property(f"{prefix}_cell", cell_time)
+        # Scripts run through the batch strategy
+        execute.get_cached_batch.cache_clear()
+        script_time = await best_of(lambda: aexec(script, {}, strategy="batch"))
+        record_property(f"{prefix}_script", script_time)
+
+    await measure("functions")
+    # Compare with coroutines
+    monkeypatch.setattr(execute, "has_await", lambda *statements: True)
+    await measure("coroutines")
+    execute.get_cached_batch.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_aexec_copy_on_write_namespace(strategy):
+    shared = {"x": 1}
+    local = execute.CopyOnWriteNamespace(shared)
+    await aexec("y = x + 1\nx = 3\ndef f(): return y", local, strategy=strategy)
+    assert shared == {"x": 1}
+    assert local["x"] == 3
+    assert local["y"] == 2
+    assert await aeval("f()", local) == 2
+    shared["z"] = 4
+    assert await aeval("z", local) == 4
+    assert {"x", "y", "z", "f"} <= set(local)
+    assert local.get("w") is None
+
+    # Shared names can be deleted without modifying the shared namespace
+    await aexec("del z", local, strategy=strategy)
+    assert "z" not in local and "z" not in set(local)
+    assert shared["z"] == 4
+    with pytest.raises(NameError):
+        await aeval("z", local)
+    await aexec("z = 5", local, strategy=strategy)
+    assert await aeval("z", local) == 5
+    assert shared["z"] == 4
@@ -8,7 +8,8 @@ from unittest.mock import Mock
 from contextlib import contextmanager
 
 import pytest
-from aioconsole import interact
+from aioconsole import interact, execute, AsynchronousConsole
+from aioconsole.console import InputTracker
 from aioconsole.stream import NonFileStreamReader, NonFileStreamWriter
 
 
@@ -62,6 +63,31 @@ async def test_interact_simple(monkeypatch):
         await assert_stream(reader, sys.ps1)
 
 
+@pytest.mark.asyncio
+async def test_interact_namespace_strategy(monkeypatch):
+    # Each statement is compiled once, directly as top-level code
+    compiled = []
+    original_compile_for_namespace = execute.compile_for_namespace
+    monkeypatch.setattr(
+        execute,
+        "compile_for_namespace",
+        lambda *args: compiled.append(args) or original_compile_for_namespace(*args),
+    )
+    monkeypatch.setattr(execute, "compile_coroutine_function", None)
+    with stdcontrol(monkeypatch) as (reader, writer):
+        banner = "A BANNER"
+        writer.write("x = 1\ndef f(): return x\n\nx = 2\nf()\n")
+        await writer.drain()
+        writer.stream.close()
+        console = AsynchronousConsole(strategy="namespace")
+        await console.interact(banner=banner, stop=False)
+        await assert_stream(reader, banner)
+        await assert_stream(reader, sys.ps1 * 2 + sys.ps2 + sys.ps1 * 2 + "2")
+        await assert_stream(reader, sys.ps1)
+        assert console.locals["f"].__globals__ is console.locals
+    assert len(compiled) == 4
+
+
 @pytest.mark.asyncio
 async def test_interact_traceback(monkeypatch):
     with stdcontrol(monkeypatch) as (reader, writer):
@@ -179,3 +205,89 @@ async def test_interact_cancellation(monkeypatch):
         with pytest.raises(asyncio.CancelledError):
             await task
         assert task.cancelled
+
+
+@pytest.mark.parametrize(
+    "lines, expected",
+    [
+        # Simple statements
+        (["1 + 1"], [True]),
+        ([""], [True]),
+        (["# comment"], [True]),
+        (["  x = 1"], [True]),
+        (["a b"], [True]),
+        # Brackets
+        (["x = (1,", "2, [3,", "4])"], [False, False, True]),
+        (["x = (1,", "", "2)"], [False, False, True]),
+        (["x = ')' + (", ")"], [False, True]),
+        (["x = 1)"], [True]),
+        # Strings
+        (['x = """', "(", '"""'], [False, False, True]),
+        (["x = '''a\\'''", "'''"], [False, True]),
+        (["x = 'a", "b'"], [True, True]),
+        (["x = 'a\\", "b'"], [False, True]),
+        (["x = '#' + (", ")"], [False, True]),
+        # Line continuation
+        (["x = 1 + \\", "2"], [False, True]),
+        (["x = 1  # \\"], [True]),
+        # Compound statements
+        (["def f():", "    return 1", ""], [False, False, True]),
+        (["def f(): return 1", ""], [False, True]),
+        (["if x:", "    pass", "else:", "    pass", ""], [False] * 4 + [True]),
+        (["@deco", "def f():", "    pass", ""], [False, False, False, True]),
+        (["def f():", "    x = (", "", "    )", ""], [False] * 4 + [True]),
+        (["def f():", '    """', "", '    """', ""], [False] * 4 + [True]),
+        (["def f(): return x", "x = 2"], [False, True]),
+    ],
+)
+def test_input_tracker(lines, expected):
+    tracker = InputTracker()
+    assert [tracker.feed(line) for line in lines] == expected
+
+
+@pytest.mark.asyncio
+async def test_interact_large_paste(monkeypatch):
+    sources = []
+
+    async def runsource(self, source, *args, **kwargs):
+        sources.append(source)
+        return await original_runsource(self, source, *args, **kwargs)
+
+    original_runsource = AsynchronousConsole.runsource
+    monkeypatch.setattr(AsynchronousConsole, "runsource", runsource)
+
+    with stdcontrol(monkeypatch) as (reader, writer):
+        size = 2000
+        writer.write("def f():\n" + "    x = 1\n" * size + "    return x\n\nf()\n")
+        await writer.drain()
+        writer.stream.close()
+        banner = "A BANNER"
+        await interact(banner=banner, stop=False)
+        await assert_stream(reader, banner)
+        await assert_stream(reader, sys.ps1 + sys.ps2 * (size + 2) + sys.ps1 + "1")
+        await assert_stream(reader, sys.ps1)
+
+    # The function is only compiled once it could be complete
+    assert len(sources) == 2
+    assert sources[1] == "f()"
+
+
+@pytest.mark.parametrize("bulk_input", [False, True])
+@pytest.mark.asyncio
+async def test_interact_bulk_input(bulk_input):
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"a = 1\ndef f():\n    return a + 1\n\nf()\n")
+    stdout = io.StringIO()
+    writer = NonFileStreamWriter(stdout)
+    console = AsynchronousConsole(streams=(reader, writer), bulk_input=bulk_input)
+    task = asyncio.ensure_future(console.interact(banner="", stop=False))
+    await asyncio.sleep(0.1)
+    if bulk_input:
+        # All the available lines are processed without prompting
+        assert stdout.getvalue() == "\n2\n>>> "
+    else:
+        assert stdout.getvalue() == "\n>>> >>> ... ... >>> 2\n>>> "
+    reader.feed_data(b"f() * 2\n")
+    reader.feed_eof()
+    await task
+    assert stdout.getvalue().endswith(">>> 4\n>>> \n")
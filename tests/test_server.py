@@ -4,7 +4,7 @@ import asyncio
 import pytest
 
 from aioconsole import compat
-from aioconsole.server import start_console_server, print_server
+from aioconsole.server import start_console_server, print_server, SessionStats
 
 
 @pytest.mark.asyncio
@@ -65,3 +65,126 @@ async def test_invalid_server():
         await start_console_server()
     with pytest.raises(ValueError):
         await start_console_server(path="uds", port=0)
+
+
+@pytest.mark.asyncio
+async def test_server_shared_locals():
+    shared, stats = {"x": 1}, SessionStats()
+    server = await start_console_server(
+        host="127.0.0.1", port=0, banner="test", locals=shared, stats=stats
+    )
+    address = server.sockets[0].getsockname()
+
+    reader1, writer1 = await asyncio.open_connection(*address)
+    reader2, writer2 = await asyncio.open_connection(*address)
+    assert (await reader1.readline()) == b"test\n"
+    assert (await reader2.readline()) == b"test\n"
+    writer1.write(b"x = x + 1; x\n")
+    assert (await reader1.readline()) == b">>> 2\n"
+    writer2.write(b"x\n")
+    assert (await reader2.readline()) == b">>> 1\n"
+    shared["y"] = 3
+    writer2.write(b"y\n")
+    assert (await reader2.readline()) == b">>> 3\n"
+    assert shared == {"x": 1, "y": 3}
+
+    for writer in (writer1, writer2):
+        writer.close()
+        await writer.wait_closed()
+    while stats.active:
+        await asyncio.sleep(0.01)
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_server_max_sessions_and_lazy():
+    stats = SessionStats()
+    server = await start_console_server(
+        host="127.0.0.1", port=0, banner="test", max_sessions=1, lazy=True, stats=stats
+    )
+    address = server.sockets[0].getsockname()
+
+    # The console is only created once the client sends something
+    reader1, writer1 = await asyncio.open_connection(*address)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(reader1.readline(), 0.1)
+    writer1.write(b"1+1\n")
+    assert (await reader1.readline()) == b"test\n"
+    assert (await reader1.readline()) == b">>> 2\n"
+
+    # The second session is queued until the first one ends
+    reader2, writer2 = await asyncio.open_connection(*address)
+    writer2.write(b"2+2\n")
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(reader2.readline(), 0.1)
+    writer1.write_eof()
+    assert (await reader1.readline()) == b">>> \n"
+    assert (await reader2.readline()) == b"test\n"
+    assert (await reader2.readline()) == b">>> 4\n"
+
+    # Connections closed without sending anything do not create a console
+    reader3, writer3 = await asyncio.open_connection(*address)
+    writer3.write_eof()
+    writer2.write_eof()
+    assert (await reader2.readline()) == b">>> \n"
+    assert (await reader3.read()) == b""
+    while stats.active:
+        await asyncio.sleep(0.01)
+
+    for writer in (writer1, writer2, writer3):
+        writer.close()
+        await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_server_limits_and_timeouts():
+    stats = SessionStats()
+    server = await start_console_server(
+        host="127.0.0.1",
+        port=0,
+        banner="test",
+        max_clients=1,
+        idle_timeout=0.2,
+        session_timeout=0.5,
+        write_buffer_limits="throughput",
+        stats=stats,
+    )
+    address = server.sockets[0].getsockname()
+
+    # Idle timeout
+    reader1, writer1 = await asyncio.open_connection(*address)
+    assert (await reader1.readline()) == b"test\n"
+    assert stats.active == 1
+
+    # Too many clients
+    reader2, writer2 = await asyncio.open_connection(*address)
+    assert (await reader2.read()) == b""
+    assert stats.rejected == 1
+
+    writer1.write(b"1+1\n")
+    assert (await reader1.readline()) == b">>> 2\n"
+    assert (await reader1.read()) == b">>> "
+    while stats.active:
+        await asyncio.sleep(0.01)
+    assert stats.timed_out == 1
+
+    # Session timeout, while the client is not idle
+    reader3, writer3 = await asyncio.open_connection(*address)
+    assert (await reader3.readline()) == b"test\n"
+    writer3.write(b"await asyncio.sleep(10)\n")
+    assert (await reader3.read()) == b">>> "
+    while stats.active:
+        await asyncio.sleep(0.01)
+    assert stats.timed_out == 2
+
+    assert repr(stats) == (
+        "SessionStats(accepted=2, rejected=1, timed_out=2, active=0)"
+    )
+    for writer in (writer1, writer2, writer3):
+        writer.close()
+        await writer.wait_closed()
+    server.close()
+    await server.wait_closed()
@@ -1,13 +1,22 @@
 import os
 import io
 import gc
+import base64
 import sys
+import time
 import pytest
+import subprocess
 import asyncio
 from unittest.mock import Mock
 
-from aioconsole.stream import create_standard_streams, ainput, aprint
+from aioconsole.stream import create_standard_streams, ainput, aprint, AsyncPrinter
+from aioconsole.stream import awrite, awritelines, alines
 from aioconsole.stream import is_pipe_transport_compatible, get_standard_streams
+from aioconsole.stream import close_standard_streams, STANDARD_STREAMS, EXECUTORS
+from aioconsole.stream import StandardStreamReader, NonFileStreamReader
+from aioconsole.stream import NonFileStreamWriter
+from aioconsole.stream import has_buffered_line, read_buffered_line
+from aioconsole.stream import open_file_reader
 
 
 @pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
@@ -110,7 +119,7 @@ async def test_create_standard_stream_with_non_pipe(monkeypatch):
     with pytest.raises(OSError):
         data = await reader.readline()
 
-    monkeypatch.setattr(stdin, "read", raise_keyboard_interrupt)
+    monkeypatch.setattr(stdin, "readline", raise_keyboard_interrupt)
     with pytest.raises(KeyboardInterruptLike):
         data = await reader.read()
 
@@ -240,3 +249,486 @@ async def test_aprint_with_no_stdin(monkeypatch):
     with pytest.raises(RuntimeError) as ctx:
         await reader.readline()
     assert str(ctx.value) == "ainput(): lost sys.stdin"
+
+
+@pytest.mark.asyncio
+async def test_non_file_stream_reader_prefetch():
+    stdin = io.StringIO("".join(f"{i}\n" for i in range(1000)))
+    reader = NonFileStreamReader(stdin, prefetch=8)
+    assert await reader.readline() == b"0\n"
+    # Back pressure
+    await asyncio.sleep(0.1)
+    assert 0 < len(reader.lines) <= 8
+    assert has_buffered_line(reader)
+    assert read_buffered_line(reader) == "1"
+
+    lines = [line async for line in reader]
+    assert lines == [f"{i}\n".encode() for i in range(2, 1000)]
+    assert reader.worker is None
+    assert reader.at_eof() is True
+    assert not has_buffered_line(reader)
+
+
+@pytest.mark.asyncio
+async def test_non_file_stream_reader_tty():
+    stdin = io.StringIO("a\nb\n")
+    stdin.isatty = lambda: True
+    reader = NonFileStreamReader(stdin, prefetch=8)
+    assert await reader.readline() == b"a\n"
+    # Terminal lines are only read on demand
+    await asyncio.sleep(0.1)
+    assert not reader.lines
+    assert stdin.read() == "b\n"
+
+
+@pytest.mark.asyncio
+async def test_non_file_stream_writer_batches():
+    count, line = 1000, "x" * 15 + "\n"
+    # The pending chunks are coalesced into batches
+    stdout = io.StringIO()
+    writes = []
+    stdout.write = lambda data, write=stdout.write: writes.append(data) or write(data)
+    writer = NonFileStreamWriter(stdout, max_batch_size=1024)
+    for _ in range(count):
+        await aprint(line, end="", flush=False, streams=(None, writer))
+    await writer.drain()
+    assert stdout.getvalue() == line * count
+    assert len(writes) < count * len(line) // 1024 + 2
+    assert all(len(data) < 1024 + len(line) for data in writes)
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_non_file_stream_writer_benchmark(record_property):
+    count, line = 10000, "x" * 15 + "\n"
+
+    async def measure(writer):
+        start = time.perf_counter()
+        for _ in range(count):
+            await aprint(line, end="", flush=False, streams=(None, writer))
+        await writer.drain()
+        return time.perf_counter() - start
+
+    # Non-file path, where pending chunks are coalesced into batches
+    record_property("non_file", await measure(NonFileStreamWriter(io.StringIO())))
+
+    # Pipe transport path
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+    _, writer, _ = await create_standard_streams(stdin, stdout, stderr)
+    loop = asyncio.get_running_loop()
+    output = loop.run_in_executor(None, read_exactly, r1, count * len(line))
+    record_property("pipe", await measure(writer))
+    assert (await output) == line.encode() * count
+    writer.transport.close()
+    for fd in (w0, r1, r2):
+        os.close(fd)
+
+
+def read_exactly(fd, size):
+    data = b""
+    while len(data) < size:
+        data += os.read(fd, size - len(data))
+    return data
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_standard_stream_write_buffer_limits(is_uvloop):
+    if is_uvloop:
+        pytest.skip("This test is flaky with uvloop for some reason.")
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+
+    with pytest.raises(ValueError):
+        await create_standard_streams(stdin, stdout, stderr, write_buffer_limits="?")
+
+    high, size = 4 * 1024 * 1024, 1024 * 1024
+    _, writer, _ = await create_standard_streams(
+        stdin, stdout, stderr, write_buffer_limits=(high, 0)
+    )
+    assert writer.transport.get_write_buffer_limits() == (0, high)
+
+    # Drain only waits when the high watermark is exceeded
+    writer.write(b"a" * size)
+    await asyncio.wait_for(writer.drain(), 1)
+    assert writer.transport.get_write_buffer_size() > 0
+
+    # Flush waits for all the data to be written, even when called concurrently
+    task = asyncio.ensure_future(writer.flush())
+    await asyncio.sleep(0.1)
+    other_task = asyncio.ensure_future(writer.flush())
+    await asyncio.sleep(0.1)
+    assert not task.done() and not other_task.done()
+    loop = asyncio.get_running_loop()
+    assert await loop.run_in_executor(None, read_exactly, r1, size) == b"a" * size
+    await task
+    await other_task
+    assert writer.transport.get_write_buffer_size() == 0
+    assert writer.transport.get_write_buffer_limits() == (0, high)
+
+    writer.transport.close()
+    for fd in (w0, r1, r2):
+        os.close(fd)
+
+
+@pytest.mark.asyncio
+async def test_aprint_write_buffer_limits(monkeypatch):
+    mock_stdio(monkeypatch)
+    await aprint("a", write_buffer_limits="throughput")
+    assert sys.stdout.getvalue() == "a\n"
+    with pytest.raises(ValueError):
+        await aprint("b", write_buffer_limits="unknown")
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_get_standard_streams_write_buffer_limits(monkeypatch, is_uvloop):
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    monkeypatch.setattr("sys.stdin", open(r0))
+    monkeypatch.setattr("sys.stdout", open(w1, "w"))
+    monkeypatch.setattr("sys.stderr", open(w2, "w"))
+    _, writer = await get_standard_streams(write_buffer_limits="throughput")
+    assert writer.transport.get_write_buffer_limits() == (16 * 1024, 64 * 1024)
+    # The limits of the shared streams are not changed afterwards
+    _, writer = await get_standard_streams(write_buffer_limits="latency")
+    assert writer.transport.get_write_buffer_limits() == (16 * 1024, 64 * 1024)
+    close_standard_streams()
+    for fd in (w0, r1, r2):
+        os.close(fd)
+    for stream in (sys.stdin, sys.stdout, sys.stderr):
+        stream.close()
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.writes = []
+        self.drains = 0
+
+    def write(self, data):
+        self.writes.append(data)
+
+    async def drain(self):
+        self.drains += 1
+
+
+@pytest.mark.asyncio
+async def test_async_printer():
+    writer = RecordingWriter()
+    async with AsyncPrinter(streams=(None, writer), max_size=8) as printer:
+        # Size-based flushing
+        await printer.print("a", "b")
+        await printer.print("c", sep="-", end="!\n")
+        assert writer.writes == []
+        await printer.print("d", "e", sep="-")
+        assert writer.writes == ["a b\nc!\nd-e\n"]
+        assert writer.drains == 1
+
+        # Time-based flushing
+        printer.max_delay = 0.01
+        await printer.print("f")
+        assert writer.writes == ["a b\nc!\nd-e\n"]
+        await asyncio.sleep(0.1)
+        assert writer.writes == ["a b\nc!\nd-e\n", "f\n"]
+        assert writer.drains == 1
+
+        # Final flush
+        await printer.print("g")
+    assert writer.writes == ["a b\nc!\nd-e\n", "f\n", "g\n"]
+    assert writer.drains == 2
+
+
+@pytest.mark.asyncio
+async def test_async_printer_many_lines():
+    count, stdout = 1000, io.StringIO()
+    writer = NonFileStreamWriter(stdout)
+    async with AsyncPrinter(streams=(None, writer), max_size=1024) as printer:
+        for i in range(count):
+            await printer.print("line", i)
+    assert stdout.getvalue() == "".join(f"line {i}\n" for i in range(count))
+
+
+@pytest.mark.asyncio
+async def test_awrite_non_file():
+    # Bytes go to the binary buffer, in order with the text writes
+    raw = io.BytesIO()
+    stdout = io.TextIOWrapper(raw, encoding="utf-8")
+    writer = NonFileStreamWriter(stdout)
+    await aprint("a", streams=(None, writer), flush=False)
+    await awrite(b"b\n", streams=(None, writer), flush=False)
+    await awritelines([b"c", memoryview(b"d\n")], streams=(None, writer))
+    writer.write("e\n")
+    await writer.drain()
+    assert raw.getvalue() == b"a\nb\ncd\ne\n"
+
+    # Bytes are decoded for text-only streams
+    stdout = io.StringIO()
+    writer = NonFileStreamWriter(stdout)
+    await awritelines([b"a", bytearray(b"b"), b"c\n"], streams=(None, writer))
+    assert stdout.getvalue() == "abc\n"
+
+
+@pytest.mark.asyncio
+async def test_non_file_stream_writer_text_layer():
+    # Encoded text written by the console or ainput goes through the text layer
+    raw = io.BytesIO()
+    stdout = io.TextIOWrapper(raw, encoding="latin-1", newline="\r\n")
+    writer = NonFileStreamWriter(stdout)
+    writer.write("\u00e9\n".encode())
+    writer.writelines(["a\n", b"b\n"])
+    await writer.drain()
+    assert raw.getvalue() == b"\xe9\r\na\r\nb\r\n"
+    # Only awrite and awritelines bypass it
+    await awrite(b"c\n", streams=(None, writer))
+    assert raw.getvalue() == b"\xe9\r\na\r\nb\r\nc\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_awrite_pipe(is_uvloop):
+    blob = base64.encodebytes(os.urandom(3 * 1024))
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+    _, writer, _ = await create_standard_streams(stdin, stdout, stderr)
+    lines = blob.splitlines(keepends=True)
+    await awritelines(lines, streams=(None, writer))
+    await awrite(memoryview(blob), streams=(None, writer))
+    assert read_exactly(r1, 2 * len(blob)) == blob * 2
+    writer.transport.close()
+    for fd in (w0, r1, r2):
+        os.close(fd)
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_awrite_benchmark(record_property):
+    blob = base64.encodebytes(os.urandom(3 * 1024 * 1024))
+    lines = blob.splitlines(keepends=True)
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+    _, writer, _ = await create_standard_streams(stdin, stdout, stderr)
+    loop = asyncio.get_running_loop()
+
+    async def measure(name, corofn):
+        output = loop.run_in_executor(None, read_exactly, r1, len(blob))
+        start = time.perf_counter()
+        await corofn()
+        assert (await output) == blob
+        record_property(name, time.perf_counter() - start)
+
+    async def print_lines():
+        await aprint(blob.decode(), end="", streams=(None, writer))
+
+    async def write_lines():
+        await awritelines(lines, streams=(None, writer))
+
+    await measure("aprint", print_lines)
+    await measure("awritelines", write_lines)
+    writer.transport.close()
+    for fd in (w0, r1, r2):
+        os.close(fd)
+
+
+@pytest.mark.asyncio
+async def test_alines_non_file(monkeypatch):
+    mock_stdio(monkeypatch, "a\nb\n\nc")
+    assert [line async for line in alines()] == ["a", "b", "", "c"]
+
+
+@pytest.mark.asyncio
+async def test_alines_break():
+    reader = asyncio.StreamReader()
+    reader.feed_data(b"a\nSTOP\nc\nd\n")
+    reader.feed_eof()
+    async for line in alines(streams=(reader, None)):
+        if line == "STOP":
+            break
+    # The lines after the break are left in the reader
+    assert await reader.read() == b"c\nd\n"
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_alines_pipe(is_uvloop):
+    long_line = "x" * 256 * 1024
+    lines = [f"line {i}" for i in range(1000)] + [long_line, "é", "last"]
+    data = "\n".join(lines).encode()
+
+    async def iterate_readline(streams):
+        reader, _ = streams
+        return [line.decode().rstrip("\n") async for line in reader]
+
+    async def iterate_alines(streams):
+        return [line async for line in alines(streams=streams)]
+
+    for iterate in (iterate_readline, iterate_alines):
+        r0, w0 = os.pipe()
+        r1, w1 = os.pipe()
+        r2, w2 = os.pipe()
+        stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+        streams = await create_standard_streams(stdin, stdout, stderr)
+        loop = asyncio.get_running_loop()
+        task = loop.run_in_executor(None, write_and_close, w0, data)
+        assert await iterate(streams[:2]) == lines
+        await task
+        for fd in (r1, r2):
+            os.close(fd)
+
+
+def write_and_close(fd, data):
+    with open(fd, "wb") as f:
+        f.write(data)
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Not supported on windows")
+@pytest.mark.asyncio
+async def test_standard_stream_readline_chunks(is_uvloop):
+    if is_uvloop:
+        pytest.skip("This test is flaky with uvloop for some reason.")
+    r0, w0 = os.pipe()
+    r1, w1 = os.pipe()
+    r2, w2 = os.pipe()
+    stdin, stdout, stderr = open(r0), open(w1, "w"), open(w2, "w")
+    reader, *writers = await create_standard_streams(stdin, stdout, stderr)
+    data = b"a" * 16 * 1024 * 1024 + b"\nb\nc"
+    loop = asyncio.get_running_loop()
+    task = loop.run_in_executor(None, write_and_close, w0, data)
+
+    # The buffer does not grow with the line
+    chunks, max_buffer_size = [], 0
+    async for chunk in reader.readline_chunks(32 * 1024):
+        chunks.append(chunk)
+        max_buffer_size = max(max_buffer_size, len(reader._buffer))
+    assert all(len(chunk) <= 32 * 1024 for chunk in chunks)
+    assert b"".join(chunks) == data[: 16 * 1024 * 1024 + 1]
+    assert max_buffer_size < 1024 * 1024
+
+    assert [chunk async for chunk in reader.readline_chunks()] == [b"b\n"]
+    assert [chunk async for chunk in reader.readline_chunks()] == [b"c"]
+    assert [chunk async for chunk in reader.readline_chunks()] == []
+    await task
+    for fd in (r1, r2):
+        os.close(fd)
+
+
+@pytest.mark.asyncio
+async def test_standard_stream_readline_chunks_separator():
+    reader = StandardStreamReader()
+    reader.feed_data(b"abc\r")
+    reader.feed_data(b"\nxyz\r\n")
+    reader.feed_eof()
+    chunks = reader.readline_chunks(4, separator=b"\r\n")
+    assert [chunk async for chunk in chunks] == [b"abc", b"\r\n"]
+    chunks = reader.readline_chunks(4, separator=b"\r\n")
+    assert [chunk async for chunk in chunks] == [b"xyz", b"\r\n"]
+
+
+@pytest.mark.asyncio
+async def test_create_standard_stream_with_regular_file(tmpdir):
+    count = 1000
+    path = tmpdir / "stdin.txt"
+    path.write("".join(f"line {i}\n" for i in range(count)) + "last")
+    expected = [f"line {i}" for i in range(count)] + ["last"]
+
+    with open(path) as stdin:
+        reader, _, _ = await create_standard_streams(
+            stdin, io.StringIO(), io.StringIO()
+        )
+        assert isinstance(reader, StandardStreamReader)
+        assert [line async for line in alines(streams=(reader, None))] == expected
+        assert reader.at_eof()
+        assert await reader.readline() == b""
+
+    with open(path) as stdin:
+        reader = NonFileStreamReader(stdin, prefetch=64)
+        assert [line async for line in alines(streams=(reader, None))] == expected
+
+
+@pytest.mark.asyncio
+async def test_create_standard_stream_with_buffered_regular_file(tmpdir):
+    path = tmpdir / "stdin.txt"
+    path.write("".join(f"line {i}\n" for i in range(1000)))
+    with open(path) as stdin:
+        # Mix input and ainput: the data buffered in stdin is not lost
+        assert stdin.readline() == "line 0\n"
+        reader, _, _ = await create_standard_streams(
+            stdin, io.StringIO(), io.StringIO()
+        )
+        assert isinstance(reader, NonFileStreamReader)
+        lines = [line async for line in alines(streams=(reader, None))]
+        assert lines == [f"line {i}" for i in range(1, 1000)]
+
+
+def test_file_reader_closed_loop(tmpdir, caplog):
+    path = tmpdir / "stdin.txt"
+    path.write("a\n" * 1000)
+    loop = asyncio.new_event_loop()
+    with open(path, "rb") as stdin:
+        reader = loop.run_until_complete(open_file_reader(stdin, loop=loop))
+        reader._transport.pause_reading()
+        loop.run_until_complete(asyncio.sleep(0.1))
+        loop.close()
+        reader.close()
+        del reader
+        gc.collect()
+    assert "Task was destroyed but it is pending" not in caplog.text
+
+
+def test_standard_streams_registry(monkeypatch):
+    mock_stdio(monkeypatch)
+    for loop in list(STANDARD_STREAMS):
+        close_standard_streams(loop=loop)
+    loops = [asyncio.new_event_loop() for _ in range(3)]
+    streams = [loop.run_until_complete(get_standard_streams()) for loop in loops]
+    assert all(loop in STANDARD_STREAMS for loop in loops)
+
+    # Closed loops are dropped on the next access
+    loops[0].close()
+    loops[1].close()
+    assert loops[2].run_until_complete(get_standard_streams()) == streams[2]
+    assert loops[0] not in STANDARD_STREAMS
+    assert loops[1] not in STANDARD_STREAMS
+    assert streams[0][1].stream is None
+
+    # Explicit close
+    close_standard_streams(loop=loops[2])
+    assert loops[2] not in STANDARD_STREAMS
+    assert streams[2][1].stream is None
+    assert loops[2].run_until_complete(get_standard_streams()) != streams[2]
+    loops[2].run_until_complete(aprint("a"))
+    assert "writer" in EXECUTORS
+    close_standard_streams(loop=loops[2])
+    loops[2].close()
+
+    # The executors are shut down along with the last streams
+    assert not EXECUTORS
+
+
+def imported_modules(code):
+    args = [sys.executable, "-X", "importtime", "-c", code]
+    result = subprocess.run(args, capture_output=True, text=True, check=True)
+    lines = result.stderr.splitlines()
+    return {line.split("|")[-1].strip() for line in lines[1:]}
+
+
+def test_import_time():
+    modules = imported_modules("from aioconsole import ainput, aprint")
+    modules -= imported_modules("import asyncio")
+    # Only the stream module and its own dependencies get imported
+    assert {"aioconsole", "aioconsole.stream"} <= modules
+    for name in ["console", "execute", "events", "server", "command", "apython"]:
+        assert f"aioconsole.{name}" not in modules
+    for name in ["argparse", "code", "codeop", "pydoc", "runpy", "shlex", "ctypes"]:
+        assert name not in modules